@@ -1,22 +1,62 @@
 # Based on http://oracc.org/osl/asloslfileformat/index.html.
 
+import bisect
 from collections import defaultdict
+import copy
 import datetime
 import difflib
+import functools
+import hashlib
+import itertools
+import os
+import pickle
 import re
 import sys
 import textwrap
-from typing import DefaultDict, Optional, Literal, Tuple, TypeVar
+from typing import Callable, DefaultDict, Iterable, Iterator, Optional, Literal, TextIO, Tuple, TypeVar
 import subprocess
+import time
+import tracemalloc
 import unicodedata
 
+import sign_names
+
 class Tag:
+  __slots__ = ()
   tag: str
 
+  def iter_lines(self) -> Iterator[str]:
+    """The lines of the ASL serialization of this entry."""
+    raise NotImplementedError
+
+  def write(self, stream: TextIO):
+    """Writes the ASL serialization of this entry to stream, one line at a
+    time, with a final line break.
+    """
+    for line in self.iter_lines():
+      stream.write(line)
+      stream.write("\n")
+
+  def __str__(self):
+    return "\n".join(self.iter_lines())
+
+def joined_lines(parts: Iterable[Iterable[str]], blank_line: bool = False) -> Iterator[str]:
+  """The lines of the given parts, separated by a blank line if blank_line
+  is true; a single empty line if there are no parts.
+  """
+  empty = True
+  for part in parts:
+    if blank_line and not empty:
+      yield ""
+    empty = False
+    yield from part
+  if empty:
+    yield ""
+
 class RawEntry:
-  def __init__(self, line: str, parser: "Parser"):
+  def __init__(self, line: str, line_number: int, parser: "Parser"):
     if not line.startswith("@"):
-      parser.raise_error(f"Tag does not start with @: {line}")
+      parser.raise_error(f"Tag does not start with @: {line}", line_number)
     tag, *tail = re.split(r"[ \t]+", line, maxsplit=1)
     self.tag = tag[1:]
     self.default = self.tag.endswith("+")
@@ -24,44 +64,99 @@ class RawEntry:
     if self.default or self.deprecated:
       self.tag = self.tag[:-1]
     self.text = tail[0] if tail else ""
+    # The number of the last line of the entry, i.e., the line number of the
+    # parser once it has consumed this entry.
+    self.line_number = line_number
 
   def validate(self, entry_type: type[Tag], parser: "Parser"):
     if self.tag != entry_type.tag:
       raise parser.raise_error(f"Expected @{entry_type.tag}, got @{self.tag} {self.text}")
 
+class Diagnostic:
+  """A problem found while parsing, at the given line and tag, if known."""
+  __slots__ = ("line_number", "tag", "message", "severity")
+  line_number: int
+  tag: Optional[str]
+  message: str
+  severity: Literal["error", "warning"]
+
+  def __init__(self, line_number: int, tag: Optional[str], message: str,
+               severity: Literal["error", "warning"]):
+    self.line_number = line_number
+    self.tag = tag
+    self.message = message
+    self.severity = severity
+
+  def __str__(self):
+    return f"{self.line_number}: {self.severity}: {'@' + self.tag + ': ' if self.tag else ''}{self.message}"
+
 class Parser:
   lines: list[str]
   line_number: int
   context: str
-
-  def __init__(self, lines: list[str], context: str):
+  # If true, errors in an entry of the sign list are recorded in diagnostics,
+  # and parsing resumes at the next sign or definition, instead of stopping.
+  # Warnings are recorded in diagnostics rather than printed.
+  recover: bool
+  diagnostics: list[Diagnostic]
+
+  def __init__(self, lines: list[str], context: str, line_offset: int = 0,
+               recover: bool = False):
     self.lines = lines
-    self.line_number = 0
+    # The number of lines preceding self.lines in the file, when parsing a
+    # part of it.
+    self.line_offset = line_offset
+    self.line_number = line_offset
     self.context = context
+    self.recover = recover
+    self.diagnostics = []
+    self.entries = self.tokenize()
+    self.lookahead: Optional[RawEntry] = None
+    # The last entry consumed.
+    self.entry: Optional[RawEntry] = None
+
+  def tokenize(self) -> Iterator[RawEntry]:
+    """Splits the lines into entries, joining continuation lines, in a single
+    pass.
+    """
+    lines = self.lines
+    offset = self.line_offset
+    i = 0
+    while i < len(lines):
+      line = lines[i].strip(" \t")
+      i += 1
+      if not line:
+        continue
+      try:
+        entry = RawEntry(line, offset + i, self)
+      except SyntaxError as error:
+        if not self.recover:
+          raise
+        self.record(error)
+        entry = None
+      continuation: list[str] = []
+      while i < len(lines) and lines[i].startswith(("\t", " ")):
+        continuation.append(lines[i].strip(" \t"))
+        i += 1
+      if not entry:
+        continue
+      if continuation:
+        entry.text = "\n".join((entry.text, *continuation))
+        entry.line_number = offset + i
+      yield entry
 
   def peek(self) -> Optional[RawEntry]:
-    old_line_number = self.line_number
-    entry = self.next()
-    self.line_number = old_line_number
-    return entry
+    if self.lookahead is None:
+      self.lookahead = next(self.entries, None)
+    return self.lookahead
 
   def next(self) -> Optional[RawEntry]:
-    while self.line_number < len(self.lines):
-      line = self.lines[self.line_number]
-      self.line_number += 1
-      if line.strip(" \t"):
-        result = RawEntry(line.strip(" \t"), self)
-        break
-    else:
-      return None
-    while self.line_number < len(self.lines):
-      line = self.lines[self.line_number]
-      if line.startswith("\t") or line.startswith(" "):
-        result.text += "\n" + line.strip(" \t")
-        self.line_number += 1
-      else:
-        break
-    return result
+    entry = self.peek()
+    self.lookahead = None
+    self.line_number = (entry.line_number if entry
+                        else self.line_offset + len(self.lines))
+    self.entry = entry
+    return entry
 
   def next_expecting(self, cls: type[Tag]) -> RawEntry:
     entry = self.next()
@@ -70,20 +165,57 @@ class Parser:
     entry.validate(cls, self)
     return entry
 
-  def raise_error(self, message: str):
-    raise SyntaxError(f"{self.context}:{self.line_number}: {message}")
+  def raise_error(self, message: str, line_number: Optional[int] = None,
+                  tag: Optional[str] = None):
+    if line_number is None:
+      line_number = self.line_number
+      if not tag and (entry := self.lookahead or self.entry):
+        tag = entry.tag
+    error = SyntaxError(f"{self.context}:{line_number}: {message}")
+    error.diagnostic = Diagnostic(line_number, tag, message, "error")
+    raise error
+
+  def warn(self, message: str):
+    if self.recover:
+      entry = self.lookahead or self.entry
+      self.diagnostics.append(
+          Diagnostic(self.line_number, entry and entry.tag, message, "warning"))
+    else:
+      print(f"*** {message}", file=sys.stderr)
+
+  def record(self, error: Exception, tag: Optional[str] = None):
+    """Records an error caught in recovery mode."""
+    diagnostic = getattr(error, "diagnostic", None)
+    if not diagnostic:
+      entry = self.lookahead or self.entry
+      diagnostic = Diagnostic(self.line_number, tag or (entry and entry.tag),
+                              f"{type(error).__name__}: {error}", "error")
+    self.diagnostics.append(diagnostic)
+
+  def skip_entry(self, top_level_tags: Iterable[str]):
+    """Skips the rest of the entry of the sign list in which an error was
+    found: up to the next top-level tag, or past the next @end.
+    """
+    while (entry := self.peek()) and entry.tag not in top_level_tags:
+      self.next()
+      if entry.tag == "end":
+        break
 
 TextTagSubclass = TypeVar("TextTagSubclass", bound="TextTag")
 
 class TextTag(Tag):
+  __slots__ = ("text",)
   tag: str
   text: str
 
   def __init__(self, text: str):
     self.text = text
 
-  def __str__(self):
-    return "@%s\t%s" % (self.tag, "\n\t".join(self.text.splitlines()))
+  def iter_lines(self) -> Iterator[str]:
+    first, *rest = self.text.splitlines() or [""]
+    yield f"@{self.tag}\t{first}"
+    for line in rest:
+      yield "\t" + line
 
   @classmethod
   def parse(cls: type[TextTagSubclass], parser: Parser) -> TextTagSubclass:
@@ -92,69 +224,97 @@ class TextTag(Tag):
 
 # Undocumented.
 class Fake(TextTag):
+  __slots__ = ()
   tag = "fake"
 
 class OID(TextTag):
+  __slots__ = ()
   tag = "oid"
 
 class PlusName(TextTag):
+  __slots__ = ()
   tag = "pname"
 
 class Note(TextTag):
+  __slots__ = ()
   tag = "note"
 
 class InternalNote(Note):
+  __slots__ = ()
   tag = "inote"
 
 class Literature(Note):
+  __slots__ = ()
   tag = "lit"
 
 class Ligature(TextTag):
+  __slots__ = ()
   tag = "liga"
 
 class Project(TextTag):
+  __slots__ = ()
   tag = "project"
 
 class Domain(TextTag):
+  __slots__ = ()
   tag = "domain"
 
 class ScriptDef(TextTag):
+  __slots__ = ()
   tag = "scriptdef"
 
 class Script(TextTag):
+  __slots__ = ()
   tag = "script"
 
 class Images(TextTag):
+  __slots__ = ()
   tag = "images"
 
 # Not actually arbitrary text.
 class Reference(Note):
+  __slots__ = ()
   tag = "ref"
 
+NOTE_TYPES: dict[str, type[Note]] = {
+  entry_type.tag: entry_type for entry_type in (Note, *Note.__subclasses__())}
+
+def parse_notes(parser: Parser, notes: list[Note]):
+  while (entry := parser.peek()) and entry.tag in NOTE_TYPES:
+    notes.append(NOTE_TYPES[entry.tag].parse(parser))
+
 # TODO(egg): Structure the Unicode fields.
 
 class UnicodeName(TextTag):
+  __slots__ = ()
   tag = "uname"
 
 class UnicodePrivateUseArea(TextTag):
+  __slots__ = ()
   tag = "upua"
 
 class UnicodeCuneiform(TextTag):
+  __slots__ = ()
   tag = "ucun"
 
 class UnicodeAge(TextTag):
+  __slots__ = ()
   tag = "uage"
 
 class UnicodeNote(TextTag):
+  __slots__ = ()
   tag = "unote"
 
 class UnicodeMap(TextTag):
+  __slots__ = ()
   tag = "umap"
 
 class UnicodeSequence(TextTag):
+  __slots__ = ()
   tag = "useq"
 
 class SourceRange:
+  __slots__ = ("hex_prefix", "base", "first", "last", "suffix", "width")
   base: Literal[10, 16]
 
   def __init__(self, text: str, base: Optional[Literal[10, 16]] = None):
@@ -188,8 +348,18 @@ class SourceRange:
     return hash((self.first, self.last, self.suffix))
 
   def __iter__(self):
-    yield from (SourceRange(self.format_number(n) + self.suffix, self.base)
-                for n in range(self.first, self.last + 1))
+    # Equivalent to SourceRange(self.format_number(n) + self.suffix, self.base),
+    # without reparsing the number.
+    prefix_length = 2 if self.hex_prefix else 0
+    for n in range(self.first, self.last + 1):
+      number = object.__new__(SourceRange)
+      number.hex_prefix = self.hex_prefix
+      number.base = self.base
+      number.first = n
+      number.last = n
+      number.suffix = self.suffix
+      number.width = len(self.format_number(n)) - prefix_length
+      yield number
 
   def __len__(self):
     return self.last - self.first + 1
@@ -224,6 +394,12 @@ class Source(Tag):
   range_lines: list[list[SourceRange]]
   notes: list[Note]
   base: Literal[10, 16]
+  # The unsuffixed numbers, as sorted disjoint intervals.
+  interval_starts: list[int]
+  interval_ends: list[int]
+  # The suffixes of the suffixed numbers, e.g., {33: {"a", "b"}} for 33a and
+  # 33b.
+  suffixes: dict[int, set[str]]
 
   def __init__(self, abbreviation: str, range_lines: list[list[SourceRange]]):
     self.abbreviation = abbreviation
@@ -232,6 +408,17 @@ class Source(Tag):
     self.base = next(self.ranges()).base
     if not all(r.base == self.base for line in range_lines for r in line):
       raise ValueError(f"All list numbers do not have the same base in {self.abbreviation}")
+    self.interval_starts = []
+    self.interval_ends = []
+    self.suffixes = {}
+    for r in sorted(self.ranges(), key=lambda r: r.first):
+      if r.suffix:
+        self.suffixes.setdefault(r.first, set()).add(r.suffix)
+      elif self.interval_ends and r.first <= self.interval_ends[-1] + 1:
+        self.interval_ends[-1] = max(self.interval_ends[-1], r.last)
+      else:
+        self.interval_starts.append(r.first)
+        self.interval_ends.append(r.last)
 
   def ranges(self):
     yield from (r for line in self.range_lines for r in line)
@@ -241,30 +428,33 @@ class Source(Tag):
       yield from r
 
   def __contains__(self, n: "SourceRange"):
-    return any(n in r for r in self.ranges())
+    if n.suffix:
+      return n.first == n.last and n.suffix in self.suffixes.get(n.first, ())
+    i = bisect.bisect_right(self.interval_starts, n.first) - 1
+    return i >= 0 and n.last <= self.interval_ends[i]
+
+  def has_suffixed_number(self, n: int):
+    """Whether n is listed with a suffix, e.g., 33a for 33."""
+    return n in self.suffixes
 
   @classmethod
   def parse(cls, parser: Parser) -> "Source":
     entry = parser.next_expecting(cls)
     abbreviation, numbers = entry.text.split(maxsplit=1)
     result = cls(abbreviation, [[SourceRange(r) for r in line.split()] for line in numbers.splitlines()])
-    while entry := parser.peek():
-      for entry_type in (Note, *Note.__subclasses__()):
-        if entry.tag == entry_type.tag:
-          result.notes.append(entry_type.parse(parser))
-          break
-      else:
-        break
+    parse_notes(parser, result.notes)
     return result
 
-  def __str__(self):
-    return "@%s %s %s\n%s" % (
-      self.tag,
-      self.abbreviation,
-      "\n\t".join(' '.join(str(number) for number in line) for line in self.range_lines),
-      "\n".join(str(note) for note in self.notes))
+  def iter_lines(self) -> Iterator[str]:
+    first, *rest = [' '.join(str(number) for number in line)
+                    for line in self.range_lines] or [""]
+    yield f"@{self.tag} {self.abbreviation} {first}"
+    for line in rest:
+      yield "\t" + line
+    yield from joined_lines(note.iter_lines() for note in self.notes)
 
 class Value(Tag):
+  __slots__ = ("deprecated", "uncertain", "language", "text", "notes")
   tag = "v"
   deprecated: bool
   language: Optional[str]
@@ -278,10 +468,10 @@ class Value(Tag):
     self.text = text
     self.notes = []
 
-  def __str__(self):
-    return "\n".join((
-      f"@v{'-' if self.deprecated else ''}\t{'%'+self.language + ' ' if self.language else ''}{self.text}{'?' if self.uncertain else ''}",
-      *(str(note) for note in self.notes)))
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@v{'-' if self.deprecated else ''}\t{'%'+self.language + ' ' if self.language else ''}{self.text}{'?' if self.uncertain else ''}"
+    for note in self.notes:
+      yield from note.iter_lines()
 
   @classmethod
   def parse(cls, parser: Parser):
@@ -294,16 +484,11 @@ class Value(Tag):
     uncertain = args.endswith("?")
     args = args.removesuffix("?")
     result = Value(args, language, entry.deprecated, uncertain)
-    while entry := parser.peek():
-      for entry_type in (Note, *Note.__subclasses__()):
-        if entry.tag == entry_type.tag:
-          result.notes.append(entry_type.parse(parser))
-          break
-      else:
-        break
+    parse_notes(parser, result.notes)
     return result
 
 class SourceReference(Tag):
+  __slots__ = ("source", "number", "questionable")
   tag = "list"
   source: Source
   number: SourceRange
@@ -315,18 +500,19 @@ class SourceReference(Tag):
     self.questionable = questionable
     if len(number) != 1:
       raise ValueError(f"SourceReference must have a single {source.abbreviation} number, got {number}")
-    if number not in source:
-      print(f"*** Undeclared number {source.abbreviation}{number}", file=sys.stderr)
 
-  def __str__(self):
-    return f"@list\t{self.source.abbreviation}{self.number}{'?' if self.questionable else ''}"
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@list\t{self.source.abbreviation}{self.number}{'?' if self.questionable else ''}"
 
   @classmethod
   def parse(cls, parser: Parser, sources: dict[str, Source]):
     entry = parser.next_expecting(cls)
     abbreviation, number = re.split(r"(?=\d)|(?<=\+)", entry.text, maxsplit=1)
     source = sources[abbreviation]
-    return cls(source, SourceRange(number.rstrip("?"), source.base), number.endswith("?"))
+    result = cls(source, SourceRange(number.rstrip("?"), source.base), number.endswith("?"))
+    if result.number not in source:
+      parser.warn(f"Undeclared number {source.abbreviation}{result.number}")
+    return result
 
 class System(Tag):
   tag = "sysdef"
@@ -337,22 +523,16 @@ class System(Tag):
     self.name = name
     self.notes = []
 
-  def __str__(self):
-    return "\n".join((
-      f"@{self.tag} {self.name}",
-      *(str(note) for note in self.notes)))
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag} {self.name}"
+    for note in self.notes:
+      yield from note.iter_lines()
 
   @classmethod
   def parse(cls, parser: Parser) -> "System":
     entry = parser.next_expecting(cls)
     result = cls(entry.text)
-    while entry := parser.peek():
-      for entry_type in (Note, *Note.__subclasses__()):
-        if entry.tag == entry_type.tag:
-          result.notes.append(entry_type.parse(parser))
-          break
-      else:
-        break
+    parse_notes(parser, result.notes)
     return result
 
 class LinkType(Tag):
@@ -364,28 +544,24 @@ class LinkType(Tag):
     self.name = name
     self.notes = []
 
-  def __str__(self):
-    return "\n".join((
-      f"@{self.tag} {self.name}",
-      *(str(note) for note in self.notes)))
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag} {self.name}"
+    for note in self.notes:
+      yield from note.iter_lines()
 
   @classmethod
   def parse(cls, parser: Parser) -> "LinkType":
     entry = parser.next_expecting(cls)
     result = cls(entry.text)
-    while entry := parser.peek():
-      for entry_type in (Note, *Note.__subclasses__()):
-        if entry.tag == entry_type.tag:
-          result.notes.append(entry_type.parse(parser))
-          break
-      else:
-        break
+    parse_notes(parser, result.notes)
     return result
 
 class SystemBinding(TextTag):
+  __slots__ = ()
   tag = "sys"
 
 class Link(Tag):
+  __slots__ = ("system", "identifier", "url")
   tag = "link"
   system: str
   identifier: str
@@ -396,8 +572,8 @@ class Link(Tag):
     self.identifier = identifier
     self.url = url
 
-  def __str__(self):
-    return f"@{self.tag} {self.system} {self.identifier} {self.url}"
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag} {self.system} {self.identifier} {self.url}"
 
   @classmethod
   def parse(cls, parser: Parser, *args) -> "Link":
@@ -406,21 +582,22 @@ class Link(Tag):
     return cls(system, identifier, url)
 
 class SignLike:
-  pass
+  __slots__ = ()
 
 class SourceOnly(Tag, SignLike):
+  __slots__ = ("name", "deprecated", "notes")
   tag = "lref"
-  name = str
+  name: str
   notes: list[Note]
 
   def __init__(self, name: str):
     self.name = name
     self.notes = []
 
-  def __str__(self):
-    return "\n".join((
-      f"@{self.tag}\t{self.name}",
-      *(str(note) for note in self.notes)))
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag}\t{self.name}"
+    for note in self.notes:
+      yield from note.iter_lines()
 
   @classmethod
   def parse(cls, parser: Parser, sources: dict[str, Source]) -> "Form":
@@ -428,28 +605,23 @@ class SourceOnly(Tag, SignLike):
     result = cls(entry.text)
     result.deprecated = entry.deprecated
 
-    while entry := parser.peek():
-      for entry_type in (Note, *Note.__subclasses__()):
-        if entry.tag == entry_type.tag:
-          result.notes.append(entry_type.parse(parser))
-          break
-      else:
-        break
+    parse_notes(parser, result.notes)
     return result
 
 class CompoundOnly(Tag, SignLike):
+  __slots__ = ("name", "deprecated", "notes")
   tag = "compoundonly"
-  name = str
+  name: str
   notes: list[Note]
 
   def __init__(self, name: str):
     self.name = name
     self.notes = []
 
-  def __str__(self):
-    return "\n".join((
-      f"@{self.tag}\t{self.name}",
-      *(str(note) for note in self.notes)))
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag}\t{self.name}"
+    for note in self.notes:
+      yield from note.iter_lines()
 
   @classmethod
   def parse(cls, parser: Parser, sources: dict[str, Source]) -> "Form":
@@ -457,18 +629,17 @@ class CompoundOnly(Tag, SignLike):
     result = cls(entry.text)
     result.deprecated = entry.deprecated
 
-    while entry := parser.peek():
-      for entry_type in (Note, *Note.__subclasses__()):
-        if entry.tag == entry_type.tag:
-          result.notes.append(entry_type.parse(parser))
-          break
-      else:
-        break
+    parse_notes(parser, result.notes)
     return result
 
 # Omitting @sref which is not actually used.
 
 class Form(Tag):
+  __slots__ = (
+    "oid", "deprecated", "default", "names", "pname", "fake", "sources",
+    "notes", "ligatures", "unicode_name", "unicode_sequence", "unicode_pua",
+    "unicode_cuneiform", "unicode_age", "unicode_note", "unicode_map",
+    "script", "sign", "values", "systems", "links")
   tag = "form"
   oid: Optional[OID]
   deprecated: bool
@@ -496,8 +667,12 @@ class Form(Tag):
   systems: list[SystemBinding]
   links: list[Link]
 
+  tag_handlers: dict[str, "TagHandler"]
+
   def __init__(self, name: str):
     self.oid = None
+    self.deprecated = False
+    self.default = False
     self.names = [name]
     self.pname = None
     self.sources = []
@@ -526,37 +701,37 @@ class Form(Tag):
       return True
     return False
 
-  def parse_extension(self, parser: Parser, sources: dict[str, Source]) -> bool:
-    return False
-
-  def form_components_str(self):
-    return "\n".join(lines for lines in (
-        str(self.oid) if self.oid else None,
-        str(self.pname) if self.pname else None,
-        "\n".join("@aka\t%s" % name for name in self.names[1:]),
-        str(self.fake) if self.fake else None,
-        "\n".join(str(source) for source in self.sources if source.source.abbreviation != "U+"),
-        "\n".join(str(note) for note in self.notes),
-        str(self.unicode_name) if self.unicode_name else None,
-        "\n".join(str(source) for source in self.sources if source.source.abbreviation == "U+"),
-        str(self.unicode_pua) if self.unicode_pua else None,
-        str(self.unicode_sequence) if self.unicode_sequence else None,
-        str(self.unicode_cuneiform) if self.unicode_cuneiform else None,
-        str(self.unicode_map) if self.unicode_map else None,
-        str(self.unicode_age) if self.unicode_age else None,
-        str(self.unicode_note) if self.unicode_note else None,
-        str(self.script) if self.script else None,
-        "\n".join(str(value) for value in self.values),
-        "\n".join(str(system) for system in self.systems),
-        "\n".join(str(link) for link in self.links),
-        "\n".join(str(ligature) for ligature in self.ligatures)) if lines)
-
-  def __str__(self):
-    return "\n".join(lines for lines in (
-        f"@{self.tag}{'-' if self.deprecated else '+' if self.default else ''} {self.names[0]}",
-        self.form_components_str(),
-        "@@") if lines)
-
+  def parse_aka(self, parser: Parser, sources: dict[str, Source]):
+    self.names.append(parser.next().text)
+
+  def parse_source_reference(self, parser: Parser, sources: dict[str, Source]):
+    self.sources.append(SourceReference.parse(parser, sources))
+
+  def iter_component_lines(self) -> Iterator[str]:
+    for entries in (
+        (self.oid, self.pname),
+        (f"@aka\t{name}" for name in self.names[1:]),
+        (self.fake,),
+        (source for source in self.sources if source.source.abbreviation != "U+"),
+        self.notes,
+        (self.unicode_name,),
+        (source for source in self.sources if source.source.abbreviation == "U+"),
+        (self.unicode_pua, self.unicode_sequence, self.unicode_cuneiform,
+         self.unicode_map, self.unicode_age, self.unicode_note, self.script),
+        self.values,
+        self.systems,
+        self.links,
+        self.ligatures):
+      for entry in entries:
+        if isinstance(entry, str):
+          yield entry
+        elif entry:
+          yield from entry.iter_lines()
+
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag}{'-' if self.deprecated else '+' if self.default else ''} {self.names[0]}"
+    yield from self.iter_component_lines()
+    yield "@@"
 
   @classmethod
   def parse(cls, parser: Parser, sources: dict[str, Source]) -> "Form":
@@ -565,80 +740,74 @@ class Form(Tag):
     result.deprecated = entry.deprecated
     result.default = entry.default
 
+    tag_handlers = cls.tag_handlers
     while entry := parser.peek():
       if cls.check_end(parser, entry):
         break
-      if entry.tag == "aka":
-        result.names.append(entry.text)
-        parser.next()
-      elif entry.tag == OID.tag:
-        result.oid = OID.parse(parser)
-      elif entry.tag == PlusName.tag:
-        result.pname = PlusName.parse(parser)
-      elif entry.tag == SourceReference.tag:
-        result.sources.append(SourceReference.parse(parser, sources))
-      elif entry.tag == UnicodeName.tag:
-        result.unicode_name = UnicodeName.parse(parser)
-      elif entry.tag == UnicodeSequence.tag:
-        result.unicode_sequence = UnicodeSequence.parse(parser)
-      elif entry.tag == UnicodePrivateUseArea.tag:
-        result.unicode_pua = UnicodePrivateUseArea.parse(parser)
-      elif entry.tag == UnicodeCuneiform.tag:
-        result.unicode_cuneiform = UnicodeCuneiform.parse(parser)
-      elif entry.tag == UnicodeAge.tag:
-        result.unicode_age = UnicodeAge.parse(parser)
-      elif entry.tag == UnicodeNote.tag:
-        result.unicode_note = UnicodeNote.parse(parser)
-      elif entry.tag == UnicodeMap.tag:
-        result.unicode_map = UnicodeMap.parse(parser)
-      elif entry.tag == Script.tag:
-        result.script = Script.parse(parser)
-      elif entry.tag == Value.tag:
-        result.values.append(Value.parse(parser))
-      elif entry.tag == SystemBinding.tag:
-        result.systems.append(SystemBinding.parse(parser))
-      elif entry.tag == Link.tag:
-        result.links.append(Link.parse(parser))
-      elif entry.tag == Fake.tag:
-        result.fake = Fake.parse(parser)
-      elif entry.tag == Ligature.tag:
-        result.ligatures.append(Ligature.parse(parser))
-      else:
-        for entry_type in (Note, *Note.__subclasses__()):
-          if entry.tag == entry_type.tag:
-            result.notes.append(entry_type.parse(parser))
-            break
-        else:
-          if not result.parse_extension(parser, sources):
-            parser.raise_error(f"Unexpected tag @{entry.tag} {entry.text}")
+      handler = tag_handlers.get(entry.tag)
+      if not handler:
+        parser.raise_error(f"Unexpected tag @{entry.tag} {entry.text}")
+      handler(result, parser, sources)
     else:
       parser.raise_error(f"Reached end of file within {cls.__name__} block")
     result.sources = sorted(result.sources, key=lambda s: s.source.abbreviation)
     return result
 
+TagHandler = Callable[[Form, Parser, dict[str, Source]], None]
+
+def field_handler(attribute: str, entry_type: type[TextTag]) -> TagHandler:
+  def parse(form: Form, parser: Parser, sources: dict[str, Source]):
+    setattr(form, attribute, entry_type.parse(parser))
+  return parse
+
+def list_handler(attribute: str, entry_type: type[TextTag|Value|Link]) -> TagHandler:
+  def parse(form: Form, parser: Parser, sources: dict[str, Source]):
+    getattr(form, attribute).append(entry_type.parse(parser))
+  return parse
+
+# The parsers for the entries of a form block, by tag.  Subclasses of Form
+# extend this with their own entries.
+Form.tag_handlers: dict[str, TagHandler] = {
+  "aka": Form.parse_aka,
+  OID.tag: field_handler("oid", OID),
+  PlusName.tag: field_handler("pname", PlusName),
+  SourceReference.tag: Form.parse_source_reference,
+  UnicodeName.tag: field_handler("unicode_name", UnicodeName),
+  UnicodeSequence.tag: field_handler("unicode_sequence", UnicodeSequence),
+  UnicodePrivateUseArea.tag: field_handler("unicode_pua", UnicodePrivateUseArea),
+  UnicodeCuneiform.tag: field_handler("unicode_cuneiform", UnicodeCuneiform),
+  UnicodeAge.tag: field_handler("unicode_age", UnicodeAge),
+  UnicodeNote.tag: field_handler("unicode_note", UnicodeNote),
+  UnicodeMap.tag: field_handler("unicode_map", UnicodeMap),
+  Script.tag: field_handler("script", Script),
+  Value.tag: list_handler("values", Value),
+  SystemBinding.tag: list_handler("systems", SystemBinding),
+  Link.tag: list_handler("links", Link),
+  Fake.tag: field_handler("fake", Fake),
+  Ligature.tag: list_handler("ligatures", Ligature),
+  **{tag: list_handler("notes", note_type) for tag, note_type in NOTE_TYPES.items()},
+}
+
 class Sign(Form, SignLike):
+  __slots__ = ("forms",)
   tag = "sign"
   forms: list[Form]
 
-  def __str__(self):
-    return "\n".join(lines for lines in (
-        f"@{self.tag}{'-' if self.deprecated else ''} {self.names[0]}",
-        self.form_components_str(),
-        "\n".join(str(form) for form in self.forms),
-        "@end sign") if lines)
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag}{'-' if self.deprecated else ''} {self.names[0]}"
+    yield from self.iter_component_lines()
+    for form in self.forms:
+      yield from form.iter_lines()
+    yield "@end sign"
 
   def __init__(self, name):
     super().__init__(name)
     self.forms = []
 
-  def parse_extension(self, parser: Parser, sources: dict[str, Source]):
-    entry = parser.peek()
-    if entry.tag == Form.tag:
-      form = Form.parse(parser, sources)
-      form.sign = self
-      self.forms.append(form)
-      return True
-    return False
+  def parse_form(self, parser: Parser, sources: dict[str, Source]):
+    form = Form.parse(parser, sources)
+    form.sign = self
+    self.forms.append(form)
 
   @classmethod
   def check_end(cls, parser: Parser, entry: RawEntry):
@@ -648,28 +817,25 @@ class Sign(Form, SignLike):
     return False
 
 class Pcun(Form, SignLike):
+  __slots__ = ("forms",)
   tag = "pcun"
   forms: list[Form]
 
-  def __str__(self):
-    return "\n".join(lines for lines in (
-        f"@{self.tag}{'-' if self.deprecated else ''} {self.names[0]}",
-        self.form_components_str(),
-        "\n".join(str(form) for form in self.forms),
-        "@end pcun") if lines)
+  def iter_lines(self) -> Iterator[str]:
+    yield f"@{self.tag}{'-' if self.deprecated else ''} {self.names[0]}"
+    yield from self.iter_component_lines()
+    for form in self.forms:
+      yield from form.iter_lines()
+    yield "@end pcun"
 
   def __init__(self, name):
     super().__init__(name)
     self.forms = []
 
-  def parse_extension(self, parser: Parser, sources: dict[str, Source]):
-    entry = parser.peek()
-    if entry.tag == Form.tag:
-      form = Form.parse(parser, sources)
-      form.sign = self
-      self.forms.append(form)
-      return True
-    return False
+  def parse_form(self, parser: Parser, sources: dict[str, Source]):
+    form = Form.parse(parser, sources)
+    form.sign = self
+    self.forms.append(form)
 
   @classmethod
   def check_end(cls, parser: Parser, entry: RawEntry):
@@ -678,6 +844,40 @@ class Pcun(Form, SignLike):
       return True
     return False
 
+Sign.tag_handlers = {**Form.tag_handlers, Form.tag: Sign.parse_form}
+Pcun.tag_handlers = {**Form.tag_handlers, Form.tag: Pcun.parse_form}
+
+def forms_by_number() -> defaultdict[SourceRange, list[Form]]:
+  # A named function rather than a lambda so that SignList can be pickled.
+  return defaultdict(list)
+
+def atom_substitution_passes(
+    atomic_sequences: dict[str, str]) -> list[Tuple[re.Pattern[str], dict[str, str]]]:
+  """Returns passes which, applied in order with re.sub, replace the sequences
+  in atomic_sequences by their atoms exactly as replacing each sequence in
+  turn, from the longest to the shortest, would.
+
+  A pass matches several sequences at once; it only groups sequences of the
+  same length that neither overlap nor contain each other's atoms, since for
+  those the order of the replacements does not matter.  This makes the number
+  of passes closer to the number of distinct lengths than to the number of
+  sequences.
+  """
+  def conflict(sequence: str, atom: str, other: str, other_atom: str) -> bool:
+    return (sequence == other or atom in other or other_atom in sequence or
+            any(sequence.endswith(other[:i]) or other.endswith(sequence[:i])
+                for i in range(1, len(sequence))))
+
+  passes: list[dict[str, str]] = []
+  for atom, sequence in sorted(atomic_sequences.items(), key=lambda kv: -len(kv[1])):
+    atoms = passes[-1] if passes else None
+    if (atoms is None or len(next(iter(atoms))) != len(sequence) or
+        any(conflict(sequence, atom, other, other_atom)
+            for other, other_atom in atoms.items())):
+      passes.append({})
+    passes[-1][sequence] = atom
+  return [(re.compile("|".join(map(re.escape, atoms))), atoms) for atoms in passes]
+
 class SignList(Tag):
   tag = "signlist"
   project: Project
@@ -694,9 +894,17 @@ class SignList(Tag):
   signs_by_name: dict[str, SignLike]
   forms_by_name: defaultdict[str, list[Form]]
   forms_by_source: defaultdict[Source, defaultdict[SourceRange, list[Form]]]
+  # The lists in forms_by_list_number are those in forms_by_source.
+  forms_by_list_number: dict[str, list[Form]]
+  forms_by_xsux: defaultdict[str, list[Form]]
+  # Only the values of non-deprecated signs, excluding deprecated values and
+  # values with a language.
+  signs_by_value: defaultdict[str, list["Sign"]]
   revision: str|None = None
   date: datetime.datetime|None = None
 
+  tag_handlers: dict[str, Callable[["SignList", Parser], None]]
+
   def __init__(self, project: Project, name: str, domain: Domain):
     self.project = project
     self.name = name
@@ -713,7 +921,10 @@ class SignList(Tag):
 
     self.signs_by_name = {}
     self.forms_by_name = defaultdict(list)
-    self.forms_by_source = defaultdict(lambda: defaultdict(list))
+    self.forms_by_source = defaultdict(forms_by_number)
+    self.forms_by_list_number = {}
+    self.forms_by_xsux = defaultdict(list)
+    self.signs_by_value = defaultdict(list)
 
   def add_source(self, source: Source):
     self.sources[source.abbreviation] = source
@@ -725,17 +936,16 @@ class SignList(Tag):
     self.link_types[link_type.name] = link_type
 
   def add_sign(self, sign: SignLike, parser: Parser):
+    self.forget_name_resolutions()
     self.signs.append(sign)
     if isinstance(sign, Sign):
-      for name in sign.names:
-        self.forms_by_name[name].append(sign)
-      for s in sign.sources:
-        self.forms_by_source[s.source][s.number].append(sign)
-      for form in sign.forms:
+      for form in (sign, *sign.forms):
         for name in form.names:
           self.forms_by_name[name].append(form)
         for s in form.sources:
-          self.forms_by_source[s.source][s.number].append(form)
+          self.index_source_reference(form, s.source, s.number)
+        if form.unicode_cuneiform:
+          self.forms_by_xsux[form.unicode_cuneiform.text].append(form)
     if isinstance(sign, Form):
       names = sign.names
     else:
@@ -754,8 +964,19 @@ class SignList(Tag):
               "Duplicate sign %s. Existing:\n%s\nNew:\n%s" % (
                   name,
                   textwrap.indent(str(self.signs_by_name[name]), '  '),
-                  textwrap.indent(str(sign), '  ')))
+                  textwrap.indent(str(sign), '  ')),
+              tag=sign.tag)
       self.signs_by_name[name] = sign
+    if isinstance(sign, Sign) and not sign.deprecated:
+      for value in sign.values:
+        if value.deprecated or value.language:
+          continue
+        if value.text in self.signs_by_value and "ₓ" not in value.text:
+          parser.raise_error(
+              f"Multiple signs with value {value.text}: "
+              f"{self.signs_by_value[value.text][0].names}, {sign.names}",
+              tag=sign.tag)
+        self.signs_by_value[value.text].append(sign)
 
   def add_source_mapping(self, name: str, source: Source, n: SourceRange):
     if len(n) != 1:
@@ -763,221 +984,705 @@ class SignList(Tag):
     if name not in self.forms_by_name:
       raise KeyError(f"{name} not found")
     for form in self.forms_by_name[name]:
-      form.sources.append(SourceReference(source, n))
-      form.sources = sorted(form.sources, key=lambda s: s.source.abbreviation)
-      self.forms_by_source[source][n].append(form)
+      # Form.parse leaves the sources sorted by abbreviation; inserting after
+      # any equal keys matches what a stable sort would do.
+      if n not in source:
+        print(f"*** Undeclared number {source.abbreviation}{n}", file=sys.stderr)
+      bisect.insort(form.sources, SourceReference(source, n),
+                    key=lambda s: s.source.abbreviation)
+      self.index_source_reference(form, source, n)
+
+  def add_source_mappings(
+      self, mappings: Iterable[Tuple[str, Source, SourceRange]]
+  ) -> list[Tuple[Tuple[str, Source, SourceRange], Exception]]:
+    """Adds the given (name, source, number) mappings, in order.
+
+    Returns the mappings that could not be added, together with the reason,
+    rather than stopping at the first one.
+    """
+    errors = []
+    for mapping in mappings:
+      try:
+        self.add_source_mapping(*mapping)
+      except (KeyError, ValueError) as error:
+        errors.append((mapping, error))
+    return errors
+
+  def index_source_reference(self, form: Form, source: Source, n: SourceRange):
+    self.forget_name_resolutions()
+    forms = self.forms_by_source[source][n]
+    forms.append(form)
+    self.forms_by_list_number.setdefault(source.abbreviation + str(n), forms)
+
+  def set_unicode_cuneiform(self, form: Form, text: str):
+    self.forget_name_resolutions()
+    if form.unicode_cuneiform:
+      self.forms_by_xsux[form.unicode_cuneiform.text].remove(form)
+      form.unicode_cuneiform.text = text
+    else:
+      form.unicode_cuneiform = UnicodeCuneiform(text)
+    self.forms_by_xsux[text].append(form)
+
+  def remove_value(self, form: Form, value: Value):
+    """Removes the value from the form, and from signs_by_value."""
+    self.forget_name_resolutions()
+    form.values.remove(value)
+    signs = [sign for sign in self.signs_by_value.get(value.text, ()) if sign is not form]
+    if signs:
+      self.signs_by_value[value.text] = signs
+    else:
+      self.signs_by_value.pop(value.text, None)
+
+  def list_number(self, xsux: str, source: Source) -> Optional[SourceRange]:
+    """The lowest number of the encoding xsux in source, in numerical order,
+    so that 99 comes before 100, and 99 before 99a.
+    """
+    numbers = [s.number
+               for form in self.forms_by_xsux.get(xsux, ())
+               for s in form.sources if s.source == source]
+    return (min(numbers, key=lambda number: (number.first, number.last, number.suffix))
+            if numbers else None)
+
+  def component_encoding(self, name: str) -> Optional[str]:
+    """The encoding of the component of a compound name, which may be the name
+    of a form, a value, or a list number.
+    """
+    for form in (self.forms_by_name.get(name) or
+                 self.forms_by_name.get(f"|{name}|") or
+                 self.signs_by_value.get(name.lower()) or
+                 self.forms_by_list_number.get(name) or
+                 []):
+      if form.unicode_cuneiform:
+        return form.unicode_cuneiform.text
+    return None
+
+  @functools.cached_property
+  def name_resolver(self) -> sign_names.Resolver:
+    return sign_names.Resolver(self.component_encoding)
+
+  def forget_name_resolutions(self):
+    self.__dict__.pop("name_resolver", None)
+
+  def xsux_sequence(self, name: str) -> list[str]:
+    """The encodings of the components of the compound name |…|, or [] if the
+    name is not compound or some component has no encoding.
+    """
+    if len(name) < 2 or name[0] != "|" or name[-1] != "|":
+      return []
+    try:
+      return self.name_resolver.sequence(sign_names.parse_sign_name(name))
+    except ValueError:
+      return []
+
+  @functools.cached_property
+  def atomic_sequences(self) -> dict[str, str]:
+    """Maps atomically encoded signs to the sequence of signs they decompose
+    into.
+    """
+    result: dict[str, str] = {}
+    for name, forms in self.forms_by_name.items():
+      xsux = [form.unicode_cuneiform.text
+              for form in forms
+              if form.unicode_cuneiform]
+      if not xsux:
+        continue
+      if len(set(xsux)) > 1:
+        raise ValueError(name, xsux)
+      xsux = xsux[0]
+      if len(xsux) > 1:
+        continue
+      if 'X' in xsux or 'x' in xsux:
+        continue
+      if name[0] != "|" or name[-1] != "|":
+        continue
+      sequence_parts = self.xsux_sequence(name)
+      if sequence_parts:
+        if xsux in result and result[xsux] != ''.join(sequence_parts):
+          raise ValueError(f"Multiple decompositions {result[xsux]} != {sequence_parts} for {xsux}")
+        if len(sequence_parts) > 1:
+          result[xsux] = ''.join(sequence_parts)
+    return result
 
-  def __str__(self):
-    return "\n\n".join((
-      str(self.project),
-      f"@{self.tag} {self.name}",
-      str(self.domain),
-      "\n\n".join(str(note) for note in self.notes),
-      "\n\n".join(str(source) for source in self.sources.values()),
-      "\n\n".join(str(system) for system in self.systems.values()),
-      "\n".join(str(script) for script in self.scripts),
-      "\n\n".join(str(link_type) for link_type in self.link_types.values()),
-      "\n\n".join(str(sign) for sign in self.signs)))
+  @functools.cached_property
+  def sequence_mapping(self) -> dict[str, list[tuple[list[str], list[Form]]]]:
+    """Maps the encodings of compound names to their decompositions, with
+    atomically encoded sequences replaced by the corresponding atoms.
+    """
+    substitution_passes = atom_substitution_passes(self.atomic_sequences)
+    result: dict[str, list[tuple[list[str], list[Form]]]] = defaultdict(list)
+    for name, forms in self.forms_by_name.items():
+      xsux = [form.unicode_cuneiform.text
+              for form in forms
+              if form.unicode_cuneiform] or [f"(no @ucun for {name})"]
+      if len(set(xsux)) > 1:
+        raise ValueError(name, xsux)
+      xsux = xsux[0]
+      if name[0] != "|" or name[-1] != "|":
+        continue
+      sequence_parts = self.xsux_sequence(name)
+      if substitution_passes:
+        sequence = ''.join(sequence_parts)
+        for pattern, atoms in substitution_passes:
+          sequence = pattern.sub(lambda match: atoms[match[0]], sequence)
+        sequence_parts = list(sequence)
+      if sequence_parts:
+        result[xsux].append((sequence_parts, forms))
+    return result
+
+  def iter_lines(self) -> Iterator[str]:
+    return joined_lines((
+      self.project.iter_lines(),
+      (f"@{self.tag} {self.name}",),
+      self.domain.iter_lines(),
+      joined_lines((note.iter_lines() for note in self.notes), blank_line=True),
+      joined_lines((source.iter_lines() for source in self.sources.values()), blank_line=True),
+      joined_lines((system.iter_lines() for system in self.systems.values()), blank_line=True),
+      joined_lines(script.iter_lines() for script in self.scripts),
+      joined_lines((link_type.iter_lines() for link_type in self.link_types.values()), blank_line=True),
+      joined_lines((sign.iter_lines() for sign in self.signs), blank_line=True)),
+      blank_line=True)
 
   @classmethod
   def parse(cls, parser: Parser) -> "SignList":
+    """Parses the sign list.
+    If parser.recover is true, the result lacks the entries in which errors
+    were found, and the errors are in parser.diagnostics; errors in the
+    @project, @signlist, and @domain at the start are still raised.
+    """
     project = Project.parse(parser)
     entry = parser.next_expecting(cls)
     domain = Domain.parse(parser)
     result = cls(project, entry.text, domain)
 
+    tag_handlers = cls.tag_handlers
     while entry := parser.peek():
-      if entry.tag == InternalNote.tag:
-        result.notes.append(InternalNote.parse(parser))
-      elif entry.tag == Source.tag:
-        result.add_source(Source.parse(parser))
-      elif entry.tag == System.tag:
-        result.add_system(System.parse(parser))
-      elif entry.tag == LinkType.tag:
-        result.add_link_type(LinkType.parse(parser))
-      elif entry.tag == ScriptDef.tag:
-        result.scripts.append(ScriptDef.parse(parser))
-      elif entry.tag == Images.tag:
-        result.images.append(Images.parse(parser))
-      else:
-        for entry_type in SignLike.__subclasses__():
-          if entry.tag == entry_type.tag:
-            result.add_sign(entry_type.parse(parser, result.sources), parser)
-            break
-        else:
-          parser.raise_error(f"Expected one of {SignLike.__subclasses__()}, got {entry.tag}")
+      handler = tag_handlers.get(entry.tag)
+      try:
+        if not handler:
+          parser.raise_error(f"Expected one of {SIGN_TYPES}, got {entry.tag}")
+        handler(result, parser)
+      except RECOVERABLE_ERRORS as error:
+        if not parser.recover:
+          raise
+        parser.record(error)
+        parser.skip_entry(TOP_LEVEL_TAGS)
     return result
 
-osl_hash = subprocess.check_output(
-  ['git', 'describe', '--tags', '--always', '--dirty', '--abbrev=40', '--long'],
-  cwd=r"..\osl").decode('ascii').strip()
-osl_date = datetime.datetime.fromisoformat(
-  subprocess.check_output(
-    ['git', 'show', '--no-patch', '--format=%cI', 'HEAD'],
-    cwd=r"..\osl").decode('ascii').strip()).astimezone(datetime.timezone.utc)
-
-with open(r"..\osl\00lib\osl.asl", encoding="utf-8") as f:
-  original_lines = f.read().splitlines()
-  osl = SignList.parse(Parser(original_lines, "osl.asl"))
-
-osl.date = osl_date
-osl.revision = osl_hash
-
-diff = list(difflib.unified_diff(
-    original_lines, str(osl).splitlines(),
-    fromfile="osl.asl", tofile="formatted"))
-
-if len(diff) > 40:
-  print("*** Large diff when regenerating OSL")
-else:
-  print("\n".join(diff))
-if str(SignList.parse(Parser(str(osl).splitlines(), "str(osl)"))) != str(osl):
-  raise ValueError("Not idempotent")
-
-print(len([sign for sign in osl.signs if isinstance(sign, Sign) and (sign.sources or sign.values or sign.unicode_cuneiform) and sign.unicode_cuneiform and not sign.deprecated]), "typeable encoded signs")
-print(len([sign for sign in osl.signs if isinstance(sign, Sign) and (sign.sources or sign.values or sign.unicode_cuneiform) and not sign.deprecated]), "potential typeable signs")
-print(sum([len(sign.values) for forms in osl.forms_by_name.values() for sign in forms if (sign.sources or sign.values or sign.unicode_cuneiform) and sign.unicode_cuneiform and not sign.deprecated]), "typeable encoded values")
-
-for source in osl.sources.values():
-  missing = []
-  total = 0
-  for n in source:
-    if n in osl.forms_by_source[source]:
-      total += 1
-    else:
-      if not n.suffix and any(m.suffix and m.first == n.first for m in source):
+  def add_parsed_entries(
+      self, parser: Parser,
+      entries: list[Tuple[SignLike|InternalNote, int, list[Diagnostic]]],
+      error: Optional[Exception], diagnostics: list[Diagnostic]):
+    """Adds the results of parse_sign_block_chunk."""
+    for entry, line_number, entry_diagnostics in entries:
+      parser.diagnostics += entry_diagnostics
+      parser.line_number = line_number
+      if isinstance(entry, InternalNote):
+        self.notes.append(entry)
         continue
-      missing.append(n)
-      total += 1
-  if missing:
-    print(f"*** {len(missing)} / {total} missing numbers from {source.abbreviation}", file=sys.stderr)
-  else:
-    print(f"--- {len(missing)} / {total} missing numbers from {source.abbreviation}", file=sys.stderr)
-  if len(missing) < 20:
-    print(f"***   {' '.join(str(n) for n in missing)}", file=sys.stderr)
+      self.add_parsed_sign(entry, parser)
+    parser.diagnostics += diagnostics
+    if error:
+      raise error
+
+  def add_parsed_sign(self, sign: SignLike, parser: Parser):
+    """Adds a sign that was just parsed.  In recovery mode, errors are recorded
+    and parsing goes on with the next entry, since they are not about the
+    position of the parser.
+    """
+    try:
+      self.add_sign(sign, parser)
+    except RECOVERABLE_ERRORS as error:
+      if not parser.recover:
+        raise
+      parser.record(error)
+
+  def reparse(self, old_lines: list[str], parser: Parser,
+              hunks: list[Tuple[int, int, int, int]]) -> Optional["SignList"]:
+    """Returns the sign list in parser.lines, given that this one was parsed
+    from old_lines, and that hunks are the changes from old_lines to
+    parser.lines, as (old start, old length, new start, new length) in the
+    format of a unified diff.  The signs of the blocks whose text is unchanged
+    are reused, and only the others are parsed.
+    Returns None if the changes affect the definitions, or if the signs of
+    this sign list cannot be matched to its blocks, e.g., because of top-level
+    notes after the first sign; a full parse is needed then.
+    """
+    lines = parser.lines
+    old_starts = sign_block_starts(old_lines)
+    starts = sign_block_starts(lines)
+    if not old_starts or not starts or old_lines[:old_starts[0]] != lines[:starts[0]]:
+      return None
+    header_entries = list(Parser(old_lines[:old_starts[0]], parser.context).tokenize())
+    sign_tags = {entry_type.tag for entry_type in SIGN_TYPES}
+    if (len(self.signs) != len(old_starts) or
+        any(entry.tag in sign_tags for entry in header_entries) or
+        len(self.notes) != sum(entry.tag == InternalNote.tag for entry in header_entries)):
+      return None
 
-for forms in osl.forms_by_name.values():
-  for form in forms:
-    if form.unicode_cuneiform:
-      ucun = form.unicode_cuneiform.text.upper().replace("O", "X")
-      if len(ucun) == 1:
-        useq_from_ucun = f"U+{ord(ucun):04X}"
+    old_ends = old_starts[1:] + [len(old_lines)]
+    old_blocks = {start: (end, sign)
+                  for start, end, sign in zip(old_starts, old_ends, self.signs)}
+    # The first line after each hunk in the new lines, and the change in the
+    # number of lines up to there.
+    hunk_ends = []
+    offsets = []
+    offset = 0
+    for _, old_length, new_start, new_length in hunks:
+      offset += new_length - old_length
+      hunk_ends.append(new_start - 1 + new_length if new_length else new_start)
+      offsets.append(offset)
+
+    result = SignList(self.project, self.name, self.domain)
+    result.notes = list(self.notes)
+    result.sources = self.sources
+    result.systems = self.systems
+    result.link_types = self.link_types
+    result.scripts = self.scripts
+    result.images = self.images
+    ends = starts[1:] + [len(lines)]
+    for start, end in zip(starts, ends):
+      i = bisect.bisect_right(hunk_ends, start)
+      old_start = start - (offsets[i - 1] if i else 0)
+      old_end, old_sign = old_blocks.get(old_start, (None, None))
+      if (old_end is not None and old_end - old_start == end - start and
+          old_lines[old_start:old_end] == lines[start:end]):
+        # The line of the last entry of the block.
+        parser.line_number = end
+        while not lines[parser.line_number - 1].strip(" \t"):
+          parser.line_number -= 1
+        result.add_sign(old_sign, parser)
       else:
-        useq_from_ucun = ".".join(f"x{ord(c):04X}" for c in ucun)
-      from_hex = None
-      if form.unicode_sequence:
-        from_hex = "".join("X" if hex in "XO" else chr(int("0" + hex, 16))
-                           for hex in form.unicode_sequence.text.split("."))
-      usource = None
-      for ref in form.sources:
-        if ref.source.abbreviation == "U+":
-          usource = ref
-          if from_hex:
-            raise ValueError(f"Both @useq and @list U+ in {form}")
-          from_hex = chr(usource.number.first)
-      if from_hex and from_hex != ucun:
-        raise ValueError(f"*** Inconsistent @ucun ({useq_from_ucun} =) {ucun}) and @list U+/@useq {form.unicode_sequence or usource} (= {from_hex})) in {form}")
-
-
-# TODO(egg): Some of this wants to be in the SignList object.
-
-signs_by_value : dict[str, list[Sign]] = defaultdict(list)
-for sign in osl.signs:
-    if isinstance(sign, Sign):
-        if sign.deprecated:
-            continue
-        for value in sign.values:
-            if value.deprecated:
-                continue
-            if value.language:
-                continue
-            if value.text in signs_by_value and "ₓ" not in value.text:
-                raise ValueError(f"Multiple signs with value {value.text}: {signs_by_value[value.text][0].names}, {sign.names}")
-            signs_by_value[value.text].append(sign)
-
-forms_by_list_number = {source.abbreviation + str(number): form
-                        for source, forms in osl.forms_by_source.items()
-                        for number, form in forms.items()}
-
-def xsux_sequence(name: str):
-    sequence_parts : list[str] = []
-    depth = 0
-    start = 1
-    for i, c in enumerate(name):
-        if i == 0:
-            continue
-        if c == '(':
-            depth += 1
-        elif c == ')':
-            depth -= 1
-        elif depth == 0 and c == '.' or i == len(name) - 1:
-            part_name = name[start:i]
-            for form in (osl.forms_by_name.get(part_name) or
-                         osl.forms_by_name.get(f"|{part_name}|") or
-                         signs_by_value.get(part_name.lower()) or
-                         forms_by_list_number.get(part_name) or
-                         []):
-                if form.unicode_cuneiform:
-                    sequence_parts.append(form.unicode_cuneiform.text)
-                    break
-            else:
-                sequence_parts = []
-                break
-            start = i + 1
-    return sequence_parts
-
-
-atomic_sequences: dict[str, str] = {}
-for name, forms in osl.forms_by_name.items():
-    xsux = [form.unicode_cuneiform.text
-            for form in forms
-            if form.unicode_cuneiform]
-    if not xsux:
-        continue
-    if len(set(xsux)) > 1:
-        raise ValueError(name, xsux)
-    xsux = xsux[0]
-    if len(xsux) > 1:
-        continue
-    if 'X' in xsux or 'x' in xsux:
-        continue
-    if name[0] != "|" or name[-1] != "|":
-        continue        
-    sequence_parts = xsux_sequence(name)
-    if sequence_parts:
-        if xsux in atomic_sequences and atomic_sequences[xsux] != ''.join(sequence_parts):
-            raise ValueError(f"Multiple decompositions {atomic_sequences[xsux]} != {sequence_parts} for {xsux}")
-        if len(sequence_parts) > 1:
-            atomic_sequences[xsux] = ''.join(sequence_parts)
+        result.add_parsed_entries(parser, *parse_sign_block_chunk(
+            lines[start:lookahead_end(lines, end)], start, end, result.sources,
+            parser.context))
+    return result
 
-for xsux, decomposition in atomic_sequences.items():
-    print(f"+++ {xsux} is not {'.'.join(decomposition)}")
-print(f"--- {len(atomic_sequences)} atomically encoded sequences")
+def sign_handler(entry_type: type[SignLike]) -> Callable[[SignList, Parser], None]:
+  def parse(sign_list: SignList, parser: Parser):
+    sign_list.add_parsed_sign(entry_type.parse(parser, sign_list.sources), parser)
+  return parse
+
+SIGN_TYPES: list[type[SignLike]] = SignLike.__subclasses__()
+
+# The parsers for the top-level entries of a sign list, by tag.
+SignList.tag_handlers = {
+  InternalNote.tag: lambda sign_list, parser: sign_list.notes.append(InternalNote.parse(parser)),
+  Source.tag: lambda sign_list, parser: sign_list.add_source(Source.parse(parser)),
+  System.tag: lambda sign_list, parser: sign_list.add_system(System.parse(parser)),
+  LinkType.tag: lambda sign_list, parser: sign_list.add_link_type(LinkType.parse(parser)),
+  ScriptDef.tag: lambda sign_list, parser: sign_list.scripts.append(ScriptDef.parse(parser)),
+  Images.tag: lambda sign_list, parser: sign_list.images.append(Images.parse(parser)),
+  **{entry_type.tag: sign_handler(entry_type) for entry_type in SIGN_TYPES},
+}
+
+# The tags at which parsing resumes after an error in recovery mode.  Internal
+# notes also occur within signs.
+TOP_LEVEL_TAGS = SignList.tag_handlers.keys() - {InternalNote.tag}
+# The errors from which recovery mode recovers: those from Parser.raise_error,
+# and those from malformed entries, e.g., an unknown source abbreviation.
+RECOVERABLE_ERRORS = (SyntaxError, ValueError, KeyError)
+
+def sign_block_starts(lines: list[str]) -> list[int]:
+  """The indices of the lines that start the sign blocks following the last
+  definition (@listdef, @sysdef, etc.).  The parse of these blocks depends
+  only on the sources.
+  """
+  sign_tags = {entry_type.tag for entry_type in SIGN_TYPES}
+  definition_tags = SignList.tag_handlers.keys() - sign_tags - {InternalNote.tag}
+  # Most lines are neither; rule them out with str.startswith before matching.
+  sign_prefixes = tuple("@" + tag for tag in sign_tags)
+  definition_prefixes = tuple("@" + tag for tag in definition_tags)
+  tag_pattern = re.compile(r"[ \t]*@([^ \t]*?)[-+]?(?:[ \t]|$)")
+  starts = []
+  for i, line in enumerate(lines):
+    if line.startswith(("\t", " ")):
+      if line.lstrip(" \t").startswith(definition_prefixes):
+        if tag_pattern.match(line)[1] in definition_tags:
+          starts = []
+    elif line.startswith(sign_prefixes):
+      if tag_pattern.match(line)[1] in sign_tags:
+        starts.append(i)
+    elif line.startswith(definition_prefixes):
+      if tag_pattern.match(line)[1] in definition_tags:
+        starts = []
+  return starts
+
+def lookahead_end(lines: list[str], end: int) -> int:
+  """The end of the entry starting on line end + 1, if any, which the parser
+  may look at before finishing the entries that precede it.
+  """
+  if end == len(lines):
+    return end
+  end += 1
+  while end < len(lines) and lines[end].startswith(("\t", " ")):
+    end += 1
+  return end
+
+def parse_sign_block_chunk(
+    lines: list[str], line_offset: int, end: int, sources: dict[str, Source],
+    context: str, recover: bool = False
+) -> Tuple[list[Tuple[SignLike|InternalNote, int, list[Diagnostic]]],
+           Optional[Exception], list[Diagnostic]]:
+  """Parses the sign blocks in a chunk of the sign list.
+  Returns the parsed entries with the line at which each ends and the
+  diagnostics found up to there, the error that stopped the parse, if any, to
+  be raised once the preceding entries have been added to the sign list, and
+  the diagnostics that follow the last entry.
+  """
+  parser = Parser(lines, context, line_offset, recover)
+  entries = []
+  sign_types = {entry_type.tag: entry_type for entry_type in SIGN_TYPES}
+
+  def add(parsed: SignLike|InternalNote):
+    entries.append((parsed, parser.line_number, parser.diagnostics))
+    parser.diagnostics = []
+
+  try:
+    while (entry := parser.peek()) and entry.line_number <= end:
+      try:
+        if entry.tag == InternalNote.tag:
+          add(InternalNote.parse(parser))
+        elif entry.tag in sign_types:
+          add(sign_types[entry.tag].parse(parser, sources))
+        else:
+          parser.raise_error(f"Expected one of {SIGN_TYPES}, got {entry.tag}")
+      except RECOVERABLE_ERRORS as error:
+        if not recover:
+          raise
+        parser.record(error)
+        parser.skip_entry(TOP_LEVEL_TAGS)
+  except Exception as error:
+    return entries, error, parser.diagnostics
+  return entries, None, parser.diagnostics
+
+OSL_PATH = r"..\osl\00lib\osl.asl"
+OSL_SNAPSHOT_PATH = "osl.pickle"
+
+def snapshot_key(path: str, revision: str):
+  """The key under which the SignList parsed from the file at path is cached:
+  the OSL revision, the modification time and size of the file, and the
+  contents of this module, so that changes to the parser invalidate the cache.
+  """
+  stat = os.stat(path)
+  with open(__file__, "rb") as f:
+    parser_digest = hashlib.sha256(f.read()).hexdigest()
+  return (revision, stat.st_mtime_ns, stat.st_size, parser_digest)
+
+def load_snapshot(key, any_revision: bool = False) -> Optional[SignList]:
+  """Returns the snapshot with the given key.  If any_revision is true, returns
+  the snapshot even if it is for another revision of the OSL, so long as it was
+  made by this version of this module.
+  """
+  try:
+    with open(OSL_SNAPSHOT_PATH, "rb") as f:
+      saved_key = pickle.load(f)
+      if saved_key != key and not (any_revision and saved_key[-1] == key[-1]):
+        return None
+      return pickle.load(f)
+  except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+    return None
+
+def save_snapshot(key, sign_list: SignList):
+  with open(OSL_SNAPSHOT_PATH + ".tmp", "wb") as f:
+    pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(sign_list, f, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(OSL_SNAPSHOT_PATH + ".tmp", OSL_SNAPSHOT_PATH)
+
+def osl_revision() -> tuple[str, datetime.datetime]:
+  revision = subprocess.check_output(
+    ['git', 'describe', '--tags', '--always', '--dirty', '--abbrev=40', '--long'],
+    cwd=r"..\osl").decode('ascii').strip()
+  date = datetime.datetime.fromisoformat(
+    subprocess.check_output(
+      ['git', 'show', '--no-patch', '--format=%cI', 'HEAD'],
+      cwd=r"..\osl").decode('ascii').strip()).astimezone(datetime.timezone.utc)
+  return revision, date
+
+def osl_diff(revision: str) -> Tuple[list[str], list[Tuple[int, int, int, int]]]:
+  """Returns the lines of the OSL at the given revision, and the hunks of the
+  changes from there to the working tree.
+  """
+  path = "00lib/osl.asl"
+  old_lines = subprocess.check_output(
+    ['git', 'show', f'{revision}:{path}'],
+    cwd=r"..\osl").decode('utf-8').splitlines()
+  diff = subprocess.check_output(
+    ['git', 'diff', '--no-color', '--no-ext-diff', '-U0', revision, '--', path],
+    cwd=r"..\osl").decode('utf-8')
+  hunks = [(int(old_start), int(old_length or 1), int(new_start), int(new_length or 1))
+           for old_start, old_length, new_start, new_length in re.findall(
+               r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@", diff, re.MULTILINE)]
+  return old_lines, hunks
+
+def reparse_osl(osl: SignList) -> Optional[SignList]:
+  """Returns the current OSL, reparsing only the sign blocks changed since the
+  revision of the given one, or None if that is not possible.
+  """
+  commit = re.search(r"(?:^|-g)([0-9a-f]{40})$", osl.revision or "")
+  if not commit:
+    # Unknown or dirty revision.
+    return None
+  try:
+    old_lines, hunks = osl_diff(commit[1])
+  except (OSError, subprocess.CalledProcessError):
+    return None
+  with open(OSL_PATH, encoding="utf-8") as f:
+    return osl.reparse(old_lines, Parser(f.read().splitlines(), "osl.asl"), hunks)
+
+def check_reparse(revision: str):
+  """Checks that reparsing the changes since the given revision gives the same
+  result as a full parse.
+  """
+  old_lines, hunks = osl_diff(revision)
+  old = SignList.parse(Parser(old_lines, "osl.asl"))
+  start = time.perf_counter()
+  with open(OSL_PATH, encoding="utf-8") as f:
+    reparsed = old.reparse(old_lines, Parser(f.read().splitlines(), "osl.asl"), hunks)
+  incremental = time.perf_counter() - start
+  if not reparsed:
+    raise ValueError(f"Cannot reparse from {revision}")
+  start = time.perf_counter()
+  parsed = parse_osl()
+  full = time.perf_counter() - start
+  for attribute in ("signs_by_name", "forms_by_name", "forms_by_list_number",
+                    "forms_by_xsux", "signs_by_value"):
+    if ({key: [str(form) for form in value] if isinstance(value, list) else str(value)
+         for key, value in getattr(reparsed, attribute).items()} !=
+        {key: [str(form) for form in value] if isinstance(value, list) else str(value)
+         for key, value in getattr(parsed, attribute).items()}):
+      raise ValueError(f"Reparse and full parse differ in {attribute}")
+  if any(line != parsed_line for line, parsed_line in
+         itertools.zip_longest(reparsed.iter_lines(), parsed.iter_lines())):
+    raise ValueError("Reparse and full parse differ")
+  print(f"Reparsed {len(hunks)} changes since {revision} in {incremental:.3f} s; full parse: {full:.3f} s")
+
+def parse_osl() -> SignList:
+  with open(OSL_PATH, encoding="utf-8") as f:
+    return SignList.parse(Parser(f.read().splitlines(), "osl.asl"))
+
+def parse_osl_with_diagnostics() -> Tuple[SignList, list[Diagnostic]]:
+  """Parses the OSL in recovery mode, returning the signs that could be parsed
+  and all the problems found.
+  """
+  with open(OSL_PATH, encoding="utf-8") as f:
+    parser = Parser(f.read().splitlines(), "osl.asl", recover=True)
+  return SignList.parse(parser), parser.diagnostics
+
+def report_diagnostics():
+  osl, diagnostics = parse_osl_with_diagnostics()
+  for diagnostic in diagnostics:
+    print(f"{'***' if diagnostic.severity == 'error' else '---'} osl.asl:{diagnostic}")
+  errors = sum(diagnostic.severity == "error" for diagnostic in diagnostics)
+  print(f"{len(osl.signs)} signs parsed, {errors} errors, {len(diagnostics) - errors} warnings")
+  if errors:
+    sys.exit(1)
+
+# The OSL loaded by load_osl.
+loaded_osl: Optional[SignList] = None
+
+def load_osl() -> SignList:
+  """Returns the OSL, from the snapshot if it is up to date, parsing and
+  caching it otherwise; if the snapshot is for an older revision, only the
+  sign blocks changed since then are parsed.  The OSL is loaded once per
+  process.  Nothing is validated here; see check.
+  """
+  global loaded_osl
+  if loaded_osl is None:
+    loaded_osl = read_osl()
+  return loaded_osl
+
+def read_osl() -> SignList:
+  revision, date = osl_revision()
+  key = snapshot_key(OSL_PATH, revision)
+  osl = load_snapshot(key)
+  if not osl:
+    previous = load_snapshot(key, any_revision=True)
+    osl = previous and reparse_osl(previous)
+    if not osl:
+      osl = parse_osl()
+    osl.date = date
+    osl.revision = revision
+    save_snapshot(key, osl)
+  return osl
+
+def __getattr__(name: str):
+  # Lazy module attributes, so that importing asl does not load the OSL.
+  if name == "osl":
+    return load_osl()
+  if name in ("signs_by_value", "forms_by_list_number"):
+    return getattr(load_osl(), name)
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def time_osl_loading():
+  start = time.perf_counter()
+  parse_osl()
+  cold = time.perf_counter() - start
+  start = time.perf_counter()
+  if not load_snapshot(snapshot_key(OSL_PATH, osl_revision()[0])):
+    raise ValueError(f"No up-to-date snapshot in {OSL_SNAPSHOT_PATH}")
+  warm = time.perf_counter() - start
+  print(f"Cold load (parsing {OSL_PATH}): {cold:.3f} s")
+  print(f"Warm load (reading {OSL_SNAPSHOT_PATH}): {warm:.3f} s")
+
+def report_memory():
+  """Reports the memory used by parsing the OSL, as traced by tracemalloc."""
+  tracemalloc.start()
+  before, _ = tracemalloc.get_traced_memory()
+  osl = parse_osl()
+  after, peak = tracemalloc.get_traced_memory()
+  snapshot = tracemalloc.take_snapshot()
+  tracemalloc.stop()
+  print(f"{len(osl.signs)} signs, {sum(len(forms) for forms in osl.forms_by_name.values())} forms by name")
+  print(f"Before loading: {before / 2**20:.1f} MiB")
+  print(f"After loading:  {after / 2**20:.1f} MiB")
+  print(f"Peak:           {peak / 2**20:.1f} MiB")
+  print("Largest allocation sites:")
+  for statistic in snapshot.statistics("lineno")[:10]:
+    print(" ", statistic)
+
+def non_idempotent_entries(osl: SignList, original_lines: list[str]) -> dict[str, str]:
+  """Checks that formatting, parsing, and formatting again gives the same
+  text, one sign block at a time.  Only the blocks whose formatted text differs
+  from their text in original_lines, from which osl was parsed, are reparsed.
+  Returns a description of the problem by name, "header" for the definitions.
+  """
+  problems: dict[str, str] = {}
+
+  def reformat(lines: list[str], parse: Callable[[Parser], Tag]) -> Optional[str]:
+    try:
+      reformatted = list(parse(Parser(lines, "formatted")).iter_lines())
+    except Exception as error:
+      return f"{type(error).__name__}: {error}"
+    if reformatted != lines:
+      return "\n".join(difflib.unified_diff(
+          lines, reformatted, fromfile="formatted", tofile="reformatted", lineterm=""))
+    return None
+
+  header = copy.copy(osl)
+  header.signs = []
+  if problem := reformat(list(header.iter_lines()), SignList.parse):
+    problems["header"] = problem
+
+  def parse_sign(parser: Parser) -> Tag:
+    entries, error, _ = parse_sign_block_chunk(
+        parser.lines, 0, len(parser.lines), osl.sources, parser.context)
+    if error:
+      raise error
+    if len(entries) != 1:
+      raise ValueError(f"Expected one sign, got {len(entries)} entries")
+    return entries[0][0]
+
+  starts = sign_block_starts(original_lines)
+  if len(starts) != len(osl.signs):
+    # The blocks cannot be matched to the signs; reparse all of them.
+    starts = ends = [0] * len(osl.signs)
+  else:
+    ends = starts[1:] + [len(original_lines)]
+  for sign, start, end in zip(osl.signs, starts, ends):
+    while end > start and not original_lines[end - 1].strip(" \t"):
+      end -= 1
+    lines = list(sign.iter_lines())
+    if lines == original_lines[start:end]:
+      # Parsing these lines gave this sign.
+      continue
+    if problem := reformat(lines, parse_sign):
+      problems[sign.names[0] if isinstance(sign, Form) else sign.name] = problem
+  return problems
+
+def check(osl: SignList):
+  """Checks that formatting the OSL is idempotent and that the OSL is
+  consistent, reporting missing list numbers and decompositions.
+  """
+  with open(OSL_PATH, encoding="utf-8") as f:
+    original_lines = f.read().splitlines()
 
-atom_replacements = sorted(atomic_sequences.items(), key=lambda kv: -len(kv[1]))
+  formatted_lines = list(osl.iter_lines())
+  diff = list(difflib.unified_diff(
+      original_lines, formatted_lines,
+      fromfile="osl.asl", tofile="formatted"))
 
-sequence_mapping: dict[str, list[tuple[list[str], list[Form]]]] = defaultdict(list)
-for name, forms in osl.forms_by_name.items():
-    xsux = [form.unicode_cuneiform.text
-            for form in forms
-            if form.unicode_cuneiform] or [f"(no @ucun for {name})"]
-    if len(set(xsux)) > 1:
-        raise ValueError(name, xsux)
-    xsux = xsux[0]
-    if name[0] != "|" or name[-1] != "|":
-        continue
-    sequence_parts = xsux_sequence(name)
-    for atom, sequence in atom_replacements:
-        sequence_parts = list(''.join(sequence_parts).replace(sequence, atom))
-    if sequence_parts:
-        sequence_mapping[xsux].append((sequence_parts, forms))
-for xsux, decompositions in sequence_mapping.items():
+  if len(diff) > 40:
+    print("*** Large diff when regenerating OSL")
+  else:
+    print("\n".join(diff))
+  if problems := non_idempotent_entries(osl, original_lines):
+    for name, problem in problems.items():
+      print(f"*** Formatting {name} is not idempotent:\n{problem}", file=sys.stderr)
+    raise ValueError(f"Not idempotent: {', '.join(problems)}")
+
+  print(len([sign for sign in osl.signs if isinstance(sign, Sign) and (sign.sources or sign.values or sign.unicode_cuneiform) and sign.unicode_cuneiform and not sign.deprecated]), "typeable encoded signs")
+  print(len([sign for sign in osl.signs if isinstance(sign, Sign) and (sign.sources or sign.values or sign.unicode_cuneiform) and not sign.deprecated]), "potential typeable signs")
+  print(sum([len(sign.values) for forms in osl.forms_by_name.values() for sign in forms if (sign.sources or sign.values or sign.unicode_cuneiform) and sign.unicode_cuneiform and not sign.deprecated]), "typeable encoded values")
+
+  for source in osl.sources.values():
+    missing = []
+    total = 0
+    for n in source:
+      if n in osl.forms_by_source[source]:
+        total += 1
+      else:
+        if not n.suffix and source.has_suffixed_number(n.first):
+          continue
+        missing.append(n)
+        total += 1
+    if missing:
+      print(f"*** {len(missing)} / {total} missing numbers from {source.abbreviation}", file=sys.stderr)
+    else:
+      print(f"--- {len(missing)} / {total} missing numbers from {source.abbreviation}", file=sys.stderr)
+    if len(missing) < 20:
+      print(f"***   {' '.join(str(n) for n in missing)}", file=sys.stderr)
+
+  for forms in osl.forms_by_name.values():
+    for form in forms:
+      if form.unicode_cuneiform:
+        ucun = form.unicode_cuneiform.text.upper().replace("O", "X")
+        if len(ucun) == 1:
+          useq_from_ucun = f"U+{ord(ucun):04X}"
+        else:
+          useq_from_ucun = ".".join(f"x{ord(c):04X}" for c in ucun)
+        from_hex = None
+        if form.unicode_sequence:
+          from_hex = "".join("X" if hex in "XO" else chr(int("0" + hex, 16))
+                             for hex in form.unicode_sequence.text.split("."))
+        usource = None
+        for ref in form.sources:
+          if ref.source.abbreviation == "U+":
+            usource = ref
+            if from_hex:
+              raise ValueError(f"Both @useq and @list U+ in {form}")
+            from_hex = chr(usource.number.first)
+        if from_hex and from_hex != ucun:
+          raise ValueError(f"*** Inconsistent @ucun ({useq_from_ucun} =) {ucun}) and @list U+/@useq {form.unicode_sequence or usource} (= {from_hex})) in {form}")
+
+  for xsux, decomposition in osl.atomic_sequences.items():
+    print(f"+++ {xsux} is not {'.'.join(decomposition)}")
+  print(f"--- {len(osl.atomic_sequences)} atomically encoded sequences")
+
+  for xsux, decompositions in osl.sequence_mapping.items():
     for decomposition, forms in decompositions:
-        if xsux != ''.join(decomposition) and len(xsux) != 1:
-            message = f"{xsux} is not {'.'.join(decomposition)}"
-            if all(form.deprecated for form in forms):
-              print("---", message, "in deprecated form")
-            elif all(''.join(xsux_sequence(form.names[0])) == xsux for form in forms):
-              print("---", message, "from alternate name")
-            else:
-              raise ValueError(message)
\ No newline at end of file
+      if xsux != ''.join(decomposition) and len(xsux) != 1:
+        message = f"{xsux} is not {'.'.join(decomposition)}"
+        if all(form.deprecated for form in forms):
+          print("---", message, "in deprecated form")
+        elif all(''.join(osl.xsux_sequence(form.names[0])) == xsux for form in forms):
+          print("---", message, "from alternate name")
+        else:
+          raise ValueError(message)
+
+if __name__ == "__main__":
+  # Use the asl module rather than __main__, so that snapshots refer to its
+  # classes.
+  import asl
+  command = sys.argv[1] if len(sys.argv) > 1 else "check"
+  if command == "check":
+    asl.check(asl.load_osl())
+  elif command == "timing":
+    asl.time_osl_loading()
+  elif command == "memory":
+    asl.report_memory()
+  elif command == "reparse" and len(sys.argv) == 3:
+    asl.check_reparse(sys.argv[2])
+  elif command == "diagnose":
+    asl.report_diagnostics()
+  else:
+    sys.exit(f"Usage: {sys.argv[0]} [check|timing|memory|reparse <revision>|diagnose]")
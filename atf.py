@@ -1,6 +1,17 @@
+import array
+import collections
 from collections import defaultdict
+import concurrent.futures
+import functools
+import gzip
+import hashlib
+import io
+import os
+import pickle
 import re
 import enum
+import sys
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO
 
 VALUE_LETTER = re.compile(r"(?:sz|s,|t,|[abdeghiklmnpqrstuvwyz'šṣṭʾŋ])",)
 VALUE_INDEX = re.compile(r"(?:[0-9₀-₉]+|x|ₓ)")
@@ -96,10 +107,71 @@ class SpanAttribute(enum.Enum):
   def __init__(self, value: int, open: str, close: str) -> None:
     self.open = open
     self.close = close
+    # The bit of this attribute in SpanAttributes.
+    self.flag = 1 << value
 
   def __str__(self) -> str:
     return self.name
 
+class SpanAttributes(enum.IntFlag):
+  """A set of SpanAttribute, as a bitmask."""
+  LOGOGRAM = 1 << 0
+  MAYBE = 1 << 1
+  DETERMINATIVE = 1 << 2
+  BROKEN = 1 << 3
+  SUPPLIED = 1 << 4
+  EXCISED = 1 << 5
+  IMPLIED = 1 << 6
+  LINGUISTIC_GLOSS = 1 << 7
+  DOCUMENT_GLOSS = 1 << 8
+
+  @classmethod
+  def of(cls, attributes: Iterable[SpanAttribute]) -> "SpanAttributes":
+    result = 0
+    for attribute in attributes:
+      result |= attribute.flag
+    return cls(result)
+
+  def members(self) -> set[SpanAttribute]:
+    return {attribute for attribute in SpanAttribute if self & attribute.flag}
+
+class Transliteration:
+  """The graphemes of a transliteration, as parallel sequences: for the
+  grapheme graphemes[i], languages[i] is its language, attributes[i] is the
+  SpanAttributes bitmask of the spans it is in, and delimiters[i] is the
+  delimiter before it, if any.  The languages and delimiters are interned.
+
+  Indexing or iterating yields (grapheme, language, set[SpanAttribute],
+  delimiter) tuples, as parse_transliteration used to return.
+  """
+  __slots__ = ("graphemes", "languages", "attributes", "delimiters")
+  graphemes: list[str]
+  languages: list[str]
+  attributes: array.array
+  delimiters: list[str|None]
+
+  def __init__(self):
+    self.graphemes = []
+    self.languages = []
+    self.attributes = array.array("H")
+    self.delimiters = []
+
+  def append(self, grapheme: str, language: str, attributes: int, delimiter: str|None):
+    self.graphemes.append(grapheme)
+    self.languages.append(language)
+    self.attributes.append(attributes)
+    self.delimiters.append(delimiter)
+
+  def __len__(self) -> int:
+    return len(self.graphemes)
+
+  def __getitem__(self, i: int) -> tuple[str, str, set[SpanAttribute], str|None]:
+    return (self.graphemes[i], self.languages[i],
+            SpanAttributes(self.attributes[i]).members(), self.delimiters[i])
+
+  def __iter__(self) -> Iterator[tuple[str, str, set[SpanAttribute], str|None]]:
+    return (self[i] for i in range(len(self)))
+
 # https://oracc.org/doc/help/editinginatf/primer/inlinetutorial/index.html#h_languages
 INLINE_LANGUAGE_CODES = {
   "a"    : "akk",
@@ -131,137 +203,190 @@ class Extension(enum.Enum):
   PLUS_AS_DELIMITER = 3,
   DIŠLESS_NUMBERS = 4,
 
-def parse_transliteration(source: str, language: str, extensions: set[Extension] = set()):
-  graphemes : list[tuple[str, str, set[SpanAttribute], str|None]] = []
+# The spans whose graphemes need not be preceded by a delimiter.
+UNDELIMITED_SPANS = (SpanAttributes.DETERMINATIVE |
+                     SpanAttributes.IMPLIED |
+                     SpanAttributes.LINGUISTIC_GLOSS).value
+
+# The spans delimited by the span token, with whether the delimiter opens them.
+SPAN_DELIMITERS = {
+  delimiter: (attribute, opening)
+  for attribute in (
+      SpanAttribute.DOCUMENT_GLOSS,
+      SpanAttribute.IMPLIED,
+      SpanAttribute.EXCISED,
+      SpanAttribute.SUPPLIED,
+      SpanAttribute.MAYBE,
+      SpanAttribute.BROKEN)
+  for delimiter, opening in ((attribute.open, True), (attribute.close, False))
+}
+
+@functools.cache
+def transliteration_token(extensions: frozenset[Extension]) -> re.Pattern[str]:
+  """Returns a pattern whose successive matches are the tokens of a
+  transliteration with the given extensions.  The name of the group that
+  matched is the kind of the token.  Where tokens of several kinds could start
+  at the same position, the alternatives are in order of precedence; anything
+  else is an error token.
+  """
+  delimiters = "-:"
+  if Extension.DOT_AS_DELIMITER in extensions:
+    delimiters += "."
+  if Extension.PLUS_AS_DELIMITER in extensions:
+    delimiters += "+"
+  return re.compile(
+    fr"""
+        (?P<space>[ ]+)
+      | (?P<grapheme>{GRAPHEME.pattern})
+      | (?P<dišless_number>{DIŠLESS_NUMBER.pattern})
+      | (?P<ellipsis>\.\.\.)
+      {"| (?P<em_dash>--)" if Extension.EM_DASH in extensions else ""}
+      | (?P<delimiter>[{re.escape(delimiters)}])
+      # Newline in case, see http://oracc.org/ns/gdl/1.0/gdltut.html#Intrusions.
+      | (?P<newline>;)
+      | (?P<logogram>_)
+      | (?P<punctuation>(?-x:{PUNCTUATION.pattern}))
+      # Column in lexical text.
+      | (?P<column>(?:(?<=[ ])|^)[#"~|=^@&][ ])
+      | (?P<inline_language>%[^ ]*[ ]?)
+      | (?P<comment>\(\$.*?\$\))
+      | (?P<unterminated_comment>\(\$)
+      | (?P<span>{"|".join(re.escape(delimiter) for delimiter in SPAN_DELIMITERS)})
+      | (?P<linguistic_gloss_open>\{{\{{)
+      | (?P<linguistic_gloss_close>\}}\}})
+      # TODO(egg): Representation for phonetic complements?
+      | (?P<determinative_open>\{{\+?)
+      | (?P<determinative_close>\}})
+      | (?P<error>.)
+    """,
+    re.VERBOSE)
+
+class TransliterationError(SyntaxError):
+  """An error at the given position in the transliteration source.  code is
+  the kind of error, such as Double delimiter, and name the offending name,
+  if any.  The message, with ☞ at the position, is only formatted when the
+  error is displayed.
+  """
+
+  def __init__(self, code: str, source: str, position: int, name: str|None = None):
+    super().__init__(code)
+    self.code = code
+    self.position = position
+    self.name = name
+    # For the traceback, which shows the source with a caret under the error.
+    self.text = source
+    self.offset = position + 1
+
+  def __str__(self) -> str:
+    return f"{self.code}: {self.text[:self.position]}☞{self.text[self.position:]}"
+
+def parse_transliteration(source: str, language: str, extensions: set[Extension] = set()) -> Transliteration:
+  graphemes = Transliteration()
+  language = sys.intern(language)
   i = 0
   after_delimiter = " "
   delimiter_before_determinative = None
   delimiter_before_linguistic_gloss = None
-  attribute_run_lengths : dict[SpanAttribute, int] = {}
+  # The SpanAttributes of the open spans, as an int for speed.
+  attributes = 0
   def start_span(attribute: SpanAttribute):
-    if attribute in attribute_run_lengths:
-      raise SyntaxError(f"Nested {attribute}: {source[:i]}☞{source[i:]}")
-    attribute_run_lengths[attribute] = 0
+    nonlocal attributes
+    if attributes & attribute.flag:
+      raise TransliterationError(f"Nested {attribute}", source, i)
+    attributes |= attribute.flag
   def end_span(attribute: SpanAttribute):
-    if attribute not in attribute_run_lengths:
-      raise SyntaxError(f"Unstarted {attribute}: {source[:i]}☞{source[i:]}")
-    del attribute_run_lengths[attribute]
-  while i < len(source):
-    while source[i] == " ":
-      i += 1
-      after_delimiter = " "
-    match = GRAPHEME.match(source, i)
-    if match:
+    nonlocal attributes
+    if not attributes & attribute.flag:
+      raise TransliterationError(f"Unstarted {attribute}", source, i)
+    attributes &= ~attribute.flag
+  for match in transliteration_token(frozenset(extensions)).finditer(source):
+    kind = match.lastgroup
+    i = match.start()
+    if kind == "grapheme":
       if Extension.UNICODE in extensions and ASCII_DIGRAPHS.search(match.group()):
-        raise SyntaxError(f"ASCII digraphs: {source[:i]}☞{source[i:]}")
+        raise TransliterationError("ASCII digraphs", source, i)
       if Extension.UNICODE not in extensions and NON_ASCII.search(match.group()):
-        raise SyntaxError(f"Non-ASCII grapheme: {source[:i]}☞{source[i:]}")
-      if (not after_delimiter and
-          attribute_run_lengths.get(SpanAttribute.DETERMINATIVE) != 0 and
-          attribute_run_lengths.get(SpanAttribute.IMPLIED) != 0 and
-          attribute_run_lengths.get(SpanAttribute.LINGUISTIC_GLOSS) != 0):
-        raise SyntaxError(f"Missing delimiter: {source[:i]}☞{source[i:]}")
-      graphemes.append((match.group(), language, set(attribute_run_lengths), after_delimiter))
-      i = match.end()
+        raise TransliterationError("Non-ASCII grapheme", source, i)
+      if not after_delimiter and not attributes & UNDELIMITED_SPANS:
+        raise TransliterationError("Missing delimiter", source, i)
+      graphemes.append(match.group(), language, attributes, after_delimiter)
       after_delimiter = None
-      continue
-    match = DIŠLESS_NUMBER.match(source, i)
-    if match:
-      i = match.end()
+    elif kind == "delimiter" or kind == "em_dash":
+      if after_delimiter:
+        raise TransliterationError("Double delimiter", source, i)
+      after_delimiter = sys.intern(match.group())
+    elif kind == "space":
+      after_delimiter = " "
+    elif kind == "dišless_number":
       after_delimiter = None
-      continue
-    if source.startswith("...", i):
-      if SpanAttribute.BROKEN not in attribute_run_lengths:
-        raise SyntaxError(f"... outside breakage brackets: {source[:i]}☞{source[i:]}")
+    elif kind == "ellipsis":
+      if not attributes & SpanAttribute.BROKEN.flag:
+        raise TransliterationError("... outside breakage brackets", source, i)
       after_delimiter = None
-      i += 3
-      continue
-    if Extension.EM_DASH in extensions and source.startswith("--", i):
-      if after_delimiter:
-        raise SyntaxError(f"Double delimiter: {source[:i]}☞{source[i:]}")
-      after_delimiter = "--"
-      i += 2
-      continue
-    if (source[i] in ("-", ":") or
-        Extension.DOT_AS_DELIMITER in extensions and source[i] == "." or
-        Extension.PLUS_AS_DELIMITER in extensions and source[i] == "+") :
-      if after_delimiter:
-        raise SyntaxError(f"Double delimiter: {source[:i]}☞{source[i:]}")
-      after_delimiter = source[i]
-      i += 1
-      continue
-    if source[i] == ";":
-      # Newline in case, see http://oracc.org/ns/gdl/1.0/gdltut.html#Intrusions.
-      i += 1
-      continue
-    if source[i] == "_":
+    elif kind == "span":
+      attribute, opening = SPAN_DELIMITERS[match.group()]
+      if opening:
+        start_span(attribute)
+      else:
+        end_span(attribute)
+    elif kind == "logogram":
       if after_delimiter:
         start_span(SpanAttribute.LOGOGRAM)
       else:
         end_span(SpanAttribute.LOGOGRAM)
-      i += 1
-      continue
-    match = PUNCTUATION.match(source, i)
-    if match:
-      i = match.end()
-      continue
-    if (source.startswith(
-      ("# ", '" ', "~ ", "| ", "= ", "^ ", "@ ", "& "), i) and
-      (i == 0 or source[i-1] == " ")):
-      # Column in lexical text.
-      i += 2
-      continue
-    if source[i] == "%":
-      inline_code = source[i+1:].split(" ", maxsplit=1)[0]
+    elif kind == "determinative_open":
+      start_span(SpanAttribute.DETERMINATIVE)
+      delimiter_before_determinative = after_delimiter
+    elif kind == "determinative_close":
+      end_span(SpanAttribute.DETERMINATIVE)
+      after_delimiter = delimiter_before_determinative
+    elif kind == "linguistic_gloss_open":
+      start_span(SpanAttribute.LINGUISTIC_GLOSS)
+      delimiter_before_linguistic_gloss = after_delimiter
+    elif kind == "linguistic_gloss_close":
+      end_span(SpanAttribute.LINGUISTIC_GLOSS)
+      after_delimiter = delimiter_before_linguistic_gloss
+    elif kind == "inline_language":
+      inline_code = match.group()[1:].rstrip(" ")
       if inline_code not in INLINE_LANGUAGE_CODES and inline_code not in INLINE_LANGUAGE_CODES.values():
-        raise NameError(f"Unknown inline language code: {source[:i]}☞{source[i:]}", name=inline_code)
-      i += len(inline_code) + 2
+        raise TransliterationError("Unknown inline language code", source, i, name=inline_code)
       after_delimiter = " "
-      language = INLINE_LANGUAGE_CODES.get(inline_code, inline_code)
-      continue
-    if source.startswith("($", i):
-      i = source.index("$)", i + 2) + 2
-      continue
-    for attribute in (
-        SpanAttribute.DOCUMENT_GLOSS,
-        SpanAttribute.IMPLIED,
-        SpanAttribute.EXCISED,
-        SpanAttribute.SUPPLIED,
-        SpanAttribute.MAYBE,
-        SpanAttribute.BROKEN):
-      if source.startswith(attribute.open, i):
-        start_span(attribute)
-        i += len(attribute.open)
-        break
-      elif source.startswith(attribute.close, i):
-        end_span(attribute)
-        i += len(attribute.close)
-        break
-    else:
-      if source.startswith(SpanAttribute.LINGUISTIC_GLOSS.open, i):
-        start_span(SpanAttribute.LINGUISTIC_GLOSS)
-        delimiter_before_linguistic_gloss = after_delimiter
-        i += len(SpanAttribute.LINGUISTIC_GLOSS.open)
-      elif source.startswith(SpanAttribute.LINGUISTIC_GLOSS.close, i):
-        end_span(SpanAttribute.LINGUISTIC_GLOSS)
-        after_delimiter = delimiter_before_linguistic_gloss
-        i += len(SpanAttribute.LINGUISTIC_GLOSS.close)
-      elif source[i] == "{":
-        start_span(SpanAttribute.DETERMINATIVE)
-        delimiter_before_determinative = after_delimiter
-        i += 1
-        if source[i] == "+":
-          # TODO(egg): Representation for phonetic complements?
-          i += 1
-      elif source[i] == "}":
-        end_span(SpanAttribute.DETERMINATIVE)
-        after_delimiter = delimiter_before_determinative
-        i += 1
-      else:
-        raise SyntaxError(f"Syntax error: {source[:i]}☞{source[i:]}")
+      language = sys.intern(INLINE_LANGUAGE_CODES.get(inline_code, inline_code))
+    elif kind == "unterminated_comment":
+      raise TransliterationError("Unterminated ($", source, i)
+    elif kind == "error":
+      raise TransliterationError("Syntax error", source, i)
   return graphemes
 
-def get_base(value: str) -> str:
+VOWELS = frozenset("aeui")
+CONSONANTS = frozenset("ʾbdghklmnpqrsṣštṭvwyz")
+
+class Syllable:
+  """The classification of a value: its base, without index; its shape, with
+  a C for each consonant and a V for each vowel of the base, and a ? for
+  anything else; and the vowels of the base.
+  """
+  __slots__ = ("base", "shape", "vowels")
+  base: str
+  shape: str
+  vowels: str
+
+  def __init__(self, base: str):
+    self.base = base
+    self.shape = "".join("V" if c in VOWELS else "C" if c in CONSONANTS else "?"
+                         for c in base)
+    self.vowels = "".join(c for c in base if c in VOWELS)
+
+# The syllables by value, classified as they are first encountered.
+SYLLABLES : dict[str, Syllable] = {}
+
+def classify(value: str) -> Syllable:
+  syllable = SYLLABLES.get(value)
+  if syllable is None:
+    syllable = SYLLABLES[value] = Syllable(compute_base(value))
+  return syllable
+
+def compute_base(value: str) -> str:
   if "-" in value:
     v = None
     cv, vc = value.split("-", maxsplit=1)
@@ -273,117 +398,286 @@ def get_base(value: str) -> str:
     return get_base(cv) + get_base(vc)[1:]
   else:
     return value.rstrip("₀₁₂₃₄₅₆₇₈₉")
+
+def get_base(value: str) -> str:
+  return classify(value).base
 def is_consonant(letter: str):
-  return letter in set("ʾbdghklmnpqrsṣštṭvwyz")
+  return letter in CONSONANTS
 def is_vowel(letter: str):
-  return letter in set("aeui")
+  return letter in VOWELS
 def is_v(value: str):
-  base = get_base(value)
-  return len(base) == 1 and is_vowel(base[0])
+  return classify(value).shape == "V"
 def is_cv(value: str):
-  base = get_base(value)
-  return len(base) == 2 and is_consonant(base[0]) and is_vowel(base[1])
+  return classify(value).shape == "CV"
 def is_vc(value: str):
-  base = get_base(value)
-  return len(base) == 2 and is_vowel(base[0]) and is_consonant(base[1])
+  return classify(value).shape == "VC"
 def is_cvc(value: str):
-  base = get_base(value)
-  return len(base) == 3 and is_consonant(base[0]) and is_vowel(base[1]) and is_consonant(base[2])
+  return classify(value).shape == "CVC"
 def get_vowel(syllable_value: str, *args: None):
-  base = get_base(syllable_value)
+  vowels = classify(syllable_value).vowels
   if args:
-    return next((v for v in base if is_vowel(v)), *args)
-  vowel, = (v for v in base if is_vowel(v))
+    return vowels[0] if vowels else args[0]
+  vowel, = vowels
   return vowel
 
-def get_value_counts(file: str, target_language: str, exclude: set[SpanAttribute]):
-  with open(file, encoding="utf-8") as f:
-    lines = f.readlines()
-  with open(file + ".log", mode="w", encoding="utf-8") as log:
-    occurrences : dict[str, list[str]] = defaultdict(list)
+class AtfLine(NamedTuple):
+  """A text line of an ATF file, with the artefact it belongs to, its language
+  as given by #atf: lang, its label (the line number, such as 1. or o 3'.),
+  and its text, stripped.
+  """
+  artefact: str
+  language: str
+  label: str
+  text: str
 
-    erroneous_texts : dict[str, list[str]] = defaultdict(list)
+# The number of lines counted at a time by a worker process in
+# get_value_counts(parallel=True).
+ATF_CHUNK_SIZE = 2000
 
-    artefact = ""
-    language = "und"
+def open_atf(path: str) -> TextIO:
+  """Opens the ATF file at path, as gzip if it ends in .gz."""
+  if path.endswith(".gz"):
+    return gzip.open(path, mode="rt", encoding="utf-8")
+  return open(path, encoding="utf-8")
 
-    for line in lines:
-      if not line.strip():
-        continue
-      if line.startswith("&"):
-        artefact = line.split("=")[0][1:].strip()
-        language = "und"
-        continue
-      elif line.startswith("#"):
-        if line.startswith("#atf: lang"):
-          language = line.split()[-1]
-        continue
-      elif line.startswith(("@", "$", "|", ">")):
+def read_atf(atf: str|Iterable[str], oracc: bool = False, log: TextIO|None = None) -> Iterator[AtfLine]:
+  """Yields the text lines of the ATF at the path atf, which is read as gzip if
+  it ends in .gz, or of the stream or lines atf, one line at a time.  Malformed lines
+  are reported to log, by default sys.stdout.
+
+  If oracc is true, translations are skipped, and the text of == lines (with
+  the label ==), as well as tabs after line numbers, are accepted, as in Oracc
+  ATF.
+  """
+  if isinstance(atf, str):
+    with open_atf(atf) as f:
+      yield from read_atf(f, oracc, log)
+    return
+  if log is None:
+    log = sys.stdout
+
+  artefact = ""
+  language = "und"
+  in_translation = False
+
+  for line in atf:
+    if not line.strip():
+      continue
+    if line.startswith("&"):
+      artefact = line.split("=")[0][1:].strip()
+      language = "und"
+      in_translation = False
+      continue
+    elif line.startswith("#"):
+      if line.startswith("#atf: lang"):
+        language = line.split()[-1]
+      continue
+    elif line.startswith(("@", "$", "|", ">")):
+      if oracc and line.startswith("@translation"):
+        in_translation = True
+      continue
+    if in_translation:
+      continue
+    if oracc and line.startswith("==%"):
+      number, text = "==", line[2:]
+    elif oracc:
+      # https://oracc.org/doc/help/editinginatf/primer/structuretutorial/index.html#h_textlines
+      # says space, but tabs occur even in
+      # https://oracc.org/doc/help/editinginatf/primer/index.html.
+      if " " not in line and "\t" not in line:
+        print("*** No space in", repr(line), file=log)
         continue
+      number, text = re.split(r"[ \t]", line, maxsplit=1)
+    else:
       if " " not in line:
         print("*** No space in", repr(line), file=log)
         continue
       number, text = line.split(" ", 1)
-      if not number.endswith("."):
-        print("*** Bad line number", repr(number), "in", line,
-              file=log)
-      text = text.strip()
-      try:
-        graphemes = parse_transliteration(text, language)
-      except (SyntaxError, NameError) as e:
-        print("***", str(e), file=log)
-        error_title = str(e).split(":")[0]
-        erroneous_texts[error_title].append(artefact)
+    if number != "==" and not number.endswith("."):
+      print("*** Bad line number", repr(number), "in", line,
+            file=log)
+    yield AtfLine(artefact, language, number, text.strip())
+
+# The Unicode letters for the ASCII digraphs of C-ATF, in the order in which
+# they are replaced.
+ASCII_DIGRAPH_LETTERS = {"sz": "š", "s,": "ṣ", "t,": "ṭ"}
+SUBSCRIPT_DIGITS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+
+@functools.lru_cache(maxsize=1 << 16)
+def normalize_grapheme(grapheme: str) -> str:
+  """Returns the grapheme without its flags, in Unicode, with subscript
+  indices, interned, so that occurrences of the same value share a key.  There
+  are few distinct graphemes, so this is memoized.
+  """
+  grapheme = grapheme.rstrip("#?!*")
+  for digraph, letter in ASCII_DIGRAPH_LETTERS.items():
+    grapheme = grapheme.replace(digraph, letter)
+  return sys.intern(grapheme.translate(SUBSCRIPT_DIGITS))
+
+ValueCounts = tuple[dict[str, list[str]], dict[str, list[str]]]
+
+def count_values(atf_lines: Iterable[AtfLine], target_language: str, excluded_attributes: int,
+                 extensions: set[Extension], log: TextIO) -> ValueCounts:
+  """Returns the artefacts in which each value, and each CV-VC or CV-V-VC
+  sequence, occurs in target_language, outside of the excluded_attributes, as
+  well as the artefacts in which each kind of error occurs.
+  """
+  occurrences : dict[str, list[str]] = defaultdict(list)
+
+  erroneous_texts : dict[str, list[str]] = defaultdict(list)
+
+  for artefact, language, _, text in atf_lines:
+    try:
+      graphemes = parse_transliteration(text, language, extensions)
+    except TransliterationError as e:
+      print("***", str(e), file=log)
+      erroneous_texts[e.code].append(artefact)
+      continue
+    previous_graphemes : list[str] = []
+    for grapheme, grapheme_language, attributes, after_delimiter in zip(
+        graphemes.graphemes, graphemes.languages, graphemes.attributes, graphemes.delimiters):
+      if after_delimiter != "-":
+        previous_graphemes = []
+      grapheme = normalize_grapheme(grapheme)
+      if not grapheme.strip():
+        previous_graphemes = []
+        continue
+
+      if any(c.isupper() for c in grapheme):
+        previous_graphemes = []
         continue
-      previous_graphemes : list[str] = []
-      for grapheme, grapheme_language, attributes, after_delimiter in graphemes:
-        if after_delimiter != "-":
-          previous_graphemes = []
-        grapheme = grapheme.rstrip("#?!*")
-        if not grapheme.strip():
-          previous_graphemes = []
-          continue
-
-        if any(c.isupper() for c in grapheme):
-          previous_graphemes = []
-          continue
-        if "/" in grapheme or "(" in grapheme:
-          previous_graphemes = []
-          continue
-        if grapheme in ("x", "n"):
-          previous_graphemes = []
-          continue
-        if grapheme_language != target_language:
-          previous_graphemes = []
-          continue
-        if any(attribute in exclude for attribute in attributes):
-          previous_graphemes = []
-          continue
-        grapheme = grapheme.replace("sz", "š").replace("s,", "ṣ").replace("t,", "ṭ")
-        grapheme = grapheme.replace(
-            "0", "₀").replace(
-            "1", "₁").replace(
-            "2", "₂").replace(
-            "3", "₃").replace(
-            "4", "₄").replace(
-            "5", "₅").replace(
-            "6", "₆").replace(
-            "7", "₇").replace(
-            "8", "₈").replace(
-            "9", "₉")
-        occurrences[grapheme].append(artefact)
-        if previous_graphemes and is_vc(grapheme):
-          this_vowel = get_vowel(grapheme)
-          previous_grapheme = previous_graphemes[-1]
-          if get_vowel(previous_grapheme, None) == this_vowel:
-            if is_cv(previous_grapheme):
-              occurrences[previous_grapheme + "-" + grapheme].append(artefact)
-            elif is_v(previous_grapheme) and len(previous_graphemes) >= 2:
-              if is_cv(previous_graphemes[-2]) and get_vowel(previous_graphemes[-2]) == this_vowel:
-                occurrences[previous_graphemes[-2] + "-" + previous_grapheme + "-" + grapheme].append(artefact)
-
-        previous_graphemes.append(grapheme)
-
-    for error_title, error_occurrences in erroneous_texts.items():
-      print(f"*** {error_title}: {len(error_occurrences)} in {len(set(error_occurrences))} texts")
-    return occurrences
\ No newline at end of file
+      if "/" in grapheme or "(" in grapheme:
+        previous_graphemes = []
+        continue
+      if grapheme in ("x", "n"):
+        previous_graphemes = []
+        continue
+      if grapheme_language != target_language:
+        previous_graphemes = []
+        continue
+      if attributes & excluded_attributes:
+        previous_graphemes = []
+        continue
+      occurrences[grapheme].append(artefact)
+      if previous_graphemes and is_vc(grapheme):
+        this_vowel = get_vowel(grapheme)
+        previous_grapheme = previous_graphemes[-1]
+        if get_vowel(previous_grapheme, None) == this_vowel:
+          if is_cv(previous_grapheme):
+            occurrences[previous_grapheme + "-" + grapheme].append(artefact)
+          elif is_v(previous_grapheme) and len(previous_graphemes) >= 2:
+            if is_cv(previous_graphemes[-2]) and get_vowel(previous_graphemes[-2]) == this_vowel:
+              occurrences[previous_graphemes[-2] + "-" + previous_grapheme + "-" + grapheme].append(artefact)
+
+      previous_graphemes.append(grapheme)
+
+  return occurrences, erroneous_texts
+
+def count_values_in_chunk(lines: list[str], target_language: str, excluded_attributes: int,
+                          extensions: set[Extension]):
+  """count_values on some lines of an ATF file, in a worker process.  Also
+  returns what was logged.
+  """
+  log = io.StringIO()
+  return (*count_values(read_atf(lines, log=log), target_language, excluded_attributes,
+                        extensions, log),
+          log.getvalue())
+
+def artefact_chunks(atf: TextIO, chunk_size: int) -> Iterator[list[str]]:
+  """Splits the lines of atf into chunks of about chunk_size lines, each
+  starting with an & line, except maybe the first, so that no artefact is
+  split.
+  """
+  chunk: list[str] = []
+  for line in atf:
+    if len(chunk) >= chunk_size and line.startswith("&"):
+      yield chunk
+      chunk = []
+    chunk.append(line)
+  if chunk:
+    yield chunk
+
+VALUE_COUNTS_CACHE_SUFFIX = ".counts.pickle"
+
+def value_counts_key(file: str, target_language: str, excluded_attributes: int,
+                     extensions: set[Extension]):
+  """The key under which the counts of the values in the ATF file are cached:
+  the digest of the file, the parameters of the count, and the contents of
+  this module, so that changes to the parser invalidate the cache.
+  """
+  with open(file, "rb") as f:
+    content_digest = hashlib.file_digest(f, "sha256").hexdigest()
+  with open(__file__, "rb") as f:
+    parser_digest = hashlib.sha256(f.read()).hexdigest()
+  return (content_digest, target_language, excluded_attributes,
+          tuple(sorted(extension.name for extension in extensions)), parser_digest)
+
+def load_value_counts(file: str, key) -> Optional[ValueCounts]:
+  try:
+    with open(file + VALUE_COUNTS_CACHE_SUFFIX, "rb") as f:
+      if pickle.load(f) != key:
+        return None
+      return pickle.load(f)
+  except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+    return None
+
+def save_value_counts(file: str, key, counts: ValueCounts):
+  path = file + VALUE_COUNTS_CACHE_SUFFIX
+  with open(path + ".tmp", "wb") as f:
+    pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(counts, f, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(path + ".tmp", path)
+
+def get_value_counts(file: str, target_language: str, exclude: set[SpanAttribute],
+                     parallel: bool = False, extensions: set[Extension] = set()):
+  """Counts the values in the ATF file, see count_values, logging malformed
+  lines to file.log, and prints a summary of the errors.  If parallel is true,
+  the artefacts are counted in a process pool; the result and the log are the
+  same as in a sequential count.
+  The counts are cached in file.counts.pickle; if the file, the parameters,
+  and this module are unchanged, they are read from there, and the log is left
+  as it is.
+  """
+  excluded_attributes = SpanAttributes.of(exclude).value
+  key = value_counts_key(file, target_language, excluded_attributes, extensions)
+  counts = load_value_counts(file, key)
+  if not counts:
+    counts = count_values_in_file(file, target_language, excluded_attributes, extensions, parallel)
+    save_value_counts(file, key, counts)
+  occurrences, erroneous_texts = counts
+
+  for error_title, error_occurrences in erroneous_texts.items():
+    print(f"*** {error_title}: {len(error_occurrences)} in {len(set(error_occurrences))} texts")
+  return occurrences
+
+def count_values_in_file(file: str, target_language: str, excluded_attributes: int,
+                         extensions: set[Extension], parallel: bool) -> ValueCounts:
+  with open(file + ".log", mode="w", encoding="utf-8") as log:
+    if not parallel:
+      return count_values(
+          read_atf(file, log=log), target_language, excluded_attributes, extensions, log)
+    occurrences : dict[str, list[str]] = defaultdict(list)
+    erroneous_texts : dict[str, list[str]] = defaultdict(list)
+    with open_atf(file) as f, concurrent.futures.ProcessPoolExecutor() as executor:
+      # The chunks are merged in order, so that the values are in the order
+      # of their first occurrence, as in a sequential count; at most a few
+      # chunks per worker are in flight, so that the file is not read into
+      # memory all at once.
+      pending: collections.deque[concurrent.futures.Future] = collections.deque()
+      max_pending = 2 * (os.cpu_count() or 1)
+      chunks = artefact_chunks(f, ATF_CHUNK_SIZE)
+      while True:
+        for chunk in chunks:
+          pending.append(executor.submit(
+              count_values_in_chunk, chunk, target_language, excluded_attributes, extensions))
+          if len(pending) >= max_pending:
+            break
+        if not pending:
+          break
+        chunk_occurrences, chunk_erroneous_texts, chunk_log = pending.popleft().result()
+        for value, artefacts in chunk_occurrences.items():
+          occurrences[value] += artefacts
+        for error_title, artefacts in chunk_erroneous_texts.items():
+          erroneous_texts[error_title] += artefacts
+        log.write(chunk_log)
+    return occurrences, erroneous_texts
@@ -0,0 +1,163 @@
+"""Benchmarks of the parsing, formatting, and indexing of sign lists by asl.py.
+
+Runs offline against sample.asl, scaled by repeating its signs under new names,
+and writes the wall time, the memory allocated (as traced by tracemalloc), and
+the peak resident set size of each scale to a JSON file, so that the results
+of different commits can be compared.
+
+Usage: python benchmark_asl.py [--scales 1 10 100] [--repeat 3] [--output benchmark_asl.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+try:
+  import resource
+except ImportError:
+  # Not available on Windows.
+  resource = None
+
+import asl
+import sign_names
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.asl")
+
+def scaled_lines(lines: list[str], factor: int) -> list[str]:
+  """Returns the given sign list with its signs repeated factor times.  In the
+  k-th copy, the names and values get the suffix ~vk, so that the copies
+  are neither duplicate signs nor duplicate values.
+  """
+  sign_starts = asl.sign_block_starts(lines)
+  if not sign_starts:
+    raise ValueError("No signs to scale")
+  header, body = lines[:sign_starts[0]], lines[sign_starts[0]:]
+  result = list(header)
+  for k in range(factor):
+    for line in body:
+      if k and re.match(r"@(sign|form|aka|lref|compoundonly|pcun)[-+]?[ \t]", line):
+        tag, name = re.split(r"[ \t]", line, maxsplit=1)
+        name = re.sub(r"[^.×&%()|+]+", lambda part: f"{part[0]}~v{k}", name)
+        line = f"{tag}{line[len(tag)]}{name}"
+      elif k and re.match(r"@v-?\t", line):
+        line = f"{line.rstrip('?')}~v{k}"
+      result.append(line)
+  return result
+
+def peak_rss() -> int|None:
+  """The peak resident set size of this process so far, in bytes.  This only
+  ever increases, so it is reported for the whole of a scale, not per phase.
+  """
+  if not resource:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Kilobytes on Linux, bytes on macOS.
+  return peak if sys.platform == "darwin" else peak * 1024
+
+def measure(phase: Callable[[], Any], repeat: int,
+            setup: Callable[[], Any] = lambda: None) -> dict[str, Any]:
+  """Runs phase repeat times for the best wall time, then once more under
+  tracemalloc, calling setup untimed before each run.
+  """
+  times = []
+  for _ in range(repeat):
+    setup()
+    start = time.perf_counter()
+    phase()
+    times.append(time.perf_counter() - start)
+  setup()
+  tracemalloc.start()
+  phase()
+  allocated, peak_allocated = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return {
+    "seconds": min(times),
+    "allocated_bytes": allocated,
+    "peak_allocated_bytes": peak_allocated,
+  }
+
+def add_signs(osl: asl.SignList):
+  """Adds the signs of osl to an empty sign list with the same definitions."""
+  parser = asl.Parser([], "benchmark")
+  result = asl.SignList(osl.project, osl.name, osl.domain)
+  result.sources = osl.sources
+  for sign in osl.signs:
+    result.add_sign(sign, parser)
+  return result
+
+def forget_name_resolutions(osl: asl.SignList):
+  """Clears the memoized parses and encodings of sign names, so that
+  xsux_sequence is measured cold rather than on cache hits.
+  """
+  osl.forget_name_resolutions()
+  sign_names.interned_names.clear()
+
+def run_scale(lines: list[str], repeat: int) -> dict[str, Any]:
+  """Benchmarks each phase on the given sign list."""
+  osl = asl.SignList.parse(asl.Parser(lines, "benchmark"))
+  phases: dict[str, Callable[[], Any]] = {
+    "tokenize": lambda: list(asl.Parser(lines, "benchmark").tokenize()),
+    "parse": lambda: asl.SignList.parse(asl.Parser(lines, "benchmark")),
+    "format": lambda: str(osl),
+    "add_sign": lambda: add_signs(osl),
+    "xsux_sequence": lambda: [osl.xsux_sequence(name) for name in osl.forms_by_name],
+  }
+  setups: dict[str, Callable[[], Any]] = {
+    "xsux_sequence": lambda: forget_name_resolutions(osl),
+  }
+  measurements = {name: measure(phase, repeat, setups.get(name, lambda: None))
+                  for name, phase in phases.items()}
+  return {
+    "lines": len(lines),
+    "signs": len(osl.signs),
+    "forms": sum(len(forms) for forms in osl.forms_by_name.values()),
+    "phases": measurements,
+    "peak_rss_bytes": peak_rss(),
+  }
+
+def main():
+  arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arguments.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+  arguments.add_argument("--repeat", type=int, default=3)
+  arguments.add_argument("--output", default="benchmark_asl.json")
+  arguments.add_argument("--fixture", default=SAMPLE_PATH)
+  # Internal: benchmark a single scale in this process and print the results.
+  arguments.add_argument("--run-scale", type=int, help=argparse.SUPPRESS)
+  args = arguments.parse_args()
+
+  with open(args.fixture, encoding="utf-8") as f:
+    lines = f.read().splitlines()
+
+  if args.run_scale:
+    json.dump(run_scale(scaled_lines(lines, args.run_scale), args.repeat), sys.stdout)
+    return
+
+  results: dict[str, Any] = {
+    "fixture": os.path.basename(args.fixture),
+    "python": sys.version,
+    "platform": sys.platform,
+    "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    "scales": {},
+  }
+  for scale in args.scales:
+    # Each scale runs in its own process so that the peak RSS is its own.
+    output = subprocess.check_output([
+        sys.executable, os.path.abspath(__file__),
+        "--run-scale", str(scale), "--repeat", str(args.repeat),
+        "--fixture", args.fixture])
+    results["scales"][str(scale)] = json.loads(output)
+    for phase, measurement in results["scales"][str(scale)]["phases"].items():
+      print(f"{scale:>4}× {phase:<14} {measurement['seconds'] * 1000:10.2f} ms "
+            f"{measurement['peak_allocated_bytes'] / 2**20:8.2f} MiB allocated")
+  with open(args.output, "w", encoding="utf-8") as f:
+    json.dump(results, f, indent=2)
+  print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+  main()
@@ -16,7 +16,7 @@ for sign in osl.signs:
     for value in sign.values:
       signs_by_value[value.text] = sign
 
-old_formatted_osl = str(osl)
+old_formatted_osl = list(osl.iter_lines())
 
 ptace = osl.sources["PTACE"]
 elles = osl.sources["ELLES"]
@@ -24,7 +24,7 @@ lak = osl.sources["LAK"]
 unicode = osl.sources["U+"]
 
 def catagnotify(osl_name, catagnoti_number):
-  osl.add_source_mapping(osl_name, ptace, SourceRange("%03d" % int(catagnoti_number)))
+  return (osl_name, ptace, SourceRange("%03d" % int(catagnoti_number)))
 
 
 osl_by_catagnoti = {}
@@ -132,13 +132,14 @@ print(len(mismatches), "mismatches")
 print(len(refinements.keys() - catagnoti_not_so_easy), "easy refinements")
 print(len(refinements), "total refinements")
 
-for catagnoti_number, name in refinements.items():
-  if catagnoti_number in catagnoti_not_so_easy:
-    continue
-  catagnotify(name, catagnoti_number)
+for (name, _, number), error in osl.add_source_mappings(
+    catagnotify(name, catagnoti_number)
+    for catagnoti_number, name in refinements.items()
+    if catagnoti_number not in catagnoti_not_so_easy):
+  print(f"*** Could not map {name} to PTACE{number}: {error}")
 
 with open("catagnotify.diff", "w", encoding="utf-8", newline='\n') as f:
-  print("\n".join(difflib.unified_diff(old_formatted_osl.splitlines(), str(osl).splitlines(),fromfile="a/00lib/osl.asl",tofile="b/00lib/osl.asl", lineterm="")), file=f)
+  print("\n".join(difflib.unified_diff(old_formatted_osl, list(osl.iter_lines()),fromfile="a/00lib/osl.asl",tofile="b/00lib/osl.asl", lineterm="")), file=f)
 
 print(f"{len(osl.forms_by_source[ptace])} Catagnoti signs in osl")
 #print(f"{len(osl.forms_by_source[elles])} ELLes signs in osl")
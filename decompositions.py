@@ -1,7 +1,22 @@
 from collections import defaultdict
-import re
 
 import asl
+import sign_names
+
+def part_encoding(part: str) -> str|None:
+    """The encoding of a grapheme in a name, which may be the name of a form,
+    a value, or a list number; unlike asl.SignList.component_encoding, this
+    does not look for a compound |part|.
+    """
+    for part_form in (asl.osl.forms_by_name.get(part) or
+                      asl.signs_by_value.get(part.lower()) or
+                      asl.forms_by_list_number.get(part) or
+                      []):
+        if part_form.unicode_cuneiform:
+            return part_form.unicode_cuneiform.text
+    return None
+
+part_resolver = sign_names.Resolver(part_encoding)
 
 with open("decompositions.txt", "w", encoding="utf-8") as f:
     mapping: dict[str, list[list[str]]] = defaultdict(list)
@@ -18,17 +33,21 @@ with open("decompositions.txt", "w", encoding="utf-8") as f:
             for name in form.names:
                 if "|" not in name and "@" not in name:
                     continue
+                # The parts are the encodings of the graphemes, or the graphemes
+                # if they have none, and the operators, modifiers (such as @g,
+                # @n, or @90, each a single part), and parentheses; the |…| of
+                # a compound name is not a part.
                 parts : list[str] = []
-                for part in re.split(r"([|.×()&+%]|@(?:[cfgstv]|180)?)", name):
-                    for part_form in (asl.osl.forms_by_name.get(part) or
-                                      asl.signs_by_value.get(part.lower()) or
-                                      asl.forms_by_list_number.get(part) or
-                                      []):
-                        if part_form.unicode_cuneiform:
-                            parts.append(part_form.unicode_cuneiform.text)
-                            break
+                try:
+                    tokens = list(sign_names.parse_sign_name(name).iter_tokens())
+                except ValueError as error:
+                    print(f"*** {error}")
+                    continue
+                for token in tokens:
+                    if isinstance(token, sign_names.Grapheme):
+                        parts.append(part_resolver.encoding(token) or token.text)
                     else:
-                        parts.append(part)
+                        parts.append(token)
                 decompositions_by_name[name] = parts
             if not decompositions_by_name:
                 continue
@@ -1,32 +1,8 @@
 from collections import defaultdict
-import json
-import os
-from typing import Any
 import unicodedata
 
 import asl
-
-def list_signs(text_json: Any, signs: list[str]):
-  if "cdl" in text_json:
-    for node in text_json["cdl"]:
-      list_signs(node, signs)
-  if "f" in text_json:
-      list_signs(text_json["f"], signs)
-  if "gdl" in text_json:
-     for node in text_json["gdl"]:
-      list_signs(node, signs)
-  if "group" in text_json:
-     for node in text_json["group"]:
-      list_signs(node, signs)
-  if "seq" in text_json:
-     for node in text_json["seq"]:
-      list_signs(node, signs)
-  # We do not go down into "qualified" for now (the index is on default values).
-  if "utf8" in text_json:
-    for c in text_json["utf8"]:
-      if ord(c) >= 0x12000 and ord(c) <= 0x1268F:
-        signs.append(c)
-
+import oracc
 
 class FontCorpusCoverage:
   def __init__(self, code_points_covered : set[str]) -> None:
@@ -75,42 +51,11 @@ class FontCorpusCoverage:
             len(set(self.sign_occurrences))
           :0.2%})"""
 
-def compute_coverage(directory: str,
+def compute_coverage(analysis: oracc.CorpusAnalysis,
                      coverage_by_font: dict[str, FontCorpusCoverage]):
-  listing = os.listdir(directory)
-  if "catalogue.json" in listing:
-    with open(directory + "/catalogue.json", encoding="utf-8") as f:
-      catalogue = json.loads(f.read())
-    files = [
-        (cdli_number,
-         directory + "/corpusjson/" + cdli_number + ".json",
-         metadata)
-        for cdli_number, metadata in catalogue["members"].items()
-        if os.path.isfile(directory + "/corpusjson/" + cdli_number + ".json")]
-    print(f"Indexing {len(files)} texts in {directory}...")
-    skipped : list[str] = []
-    for i, (cdli_number, text_file, metadata) in enumerate(files):
-      if i > 0 and i % 1000 == 0:
-        print(f"    {i}/{len(files)}...")
-      with open(text_file, encoding="utf-8") as f:
-        source = f.read()
-        if not source:
-          skipped.append(text_file)
-          continue
-        text = json.loads(source)
-      text_signs : list[str] = []
-      list_signs(text, text_signs)
-      for coverage in coverage_by_font.values():
-        coverage.add_text(cdli_number, text_signs)
-    if skipped:
-      if len(skipped) < 10:
-        for file in skipped:
-          print(f"*** {file} was empty, skipped.")
-      else:
-        print(f"*** Skipped {len(skipped)} empty files.")
-  for f in listing:
-    if os.path.isdir(directory + "/" + f) and f != "corpusjson":
-      compute_coverage(directory + "/" + f, coverage_by_font)
+  for cdli_number, text_signs in analysis.text_signs:
+    for coverage in coverage_by_font.values():
+      coverage.add_text(cdli_number, text_signs)
 
 coverage_by_font: dict[str, FontCorpusCoverage] = {}
 
@@ -122,7 +67,7 @@ for font in ("Nabuninuaihsus", "CuneiformNAOutline"):
       covered_code_points.add(chr(int(line, base=16)))
     coverage_by_font[font] = FontCorpusCoverage(covered_code_points)
 
-compute_coverage("oracc/saao", coverage_by_font)
+compute_coverage(oracc.analyse_corpus(["oracc/saao"], signs=True), coverage_by_font)
 
 for font, coverage in coverage_by_font.items():
   print(f"Most common missing signs in {font}:")
@@ -170,23 +115,8 @@ EXCLUDED_SEQUENCES = {
 
 sorted_signs : list[str] = []
 
-xsux_to_forms : dict[str, list[asl.Form]] = defaultdict(list)
-
-for forms in asl.osl.forms_by_name.values():
-  for form in forms:
-    if form.unicode_cuneiform:
-      xsux = form.unicode_cuneiform.text
-      xsux_to_forms[xsux].append(form)
-
 def get_list_number(xsux: str, list_name: str):
-  numbers : set[asl.SourceRange] = set()
-  for form in xsux_to_forms[xsux]:
-    for source_reference in form.sources:
-      if source_reference.source.abbreviation == list_name:
-          numbers.add(source_reference.number)
-  if not numbers:
-    return None
-  return sorted(numbers, key=str)[0]
+  return asl.osl.list_number(xsux, asl.osl.sources[list_name])
 
 for sign_list in "MZL", "SYA", "ASY", "SLLHA":
   for number, forms in sorted(asl.osl.forms_by_source[asl.osl.sources[sign_list]].items(),
@@ -239,7 +169,7 @@ with open("../Nabuninuaihsus/index.html", mode="w", encoding="utf8") as f:
           }</td><td class="nabuninuaihsus-sans">{
             xsux
           }</td><td>{
-            xsux_to_forms[xsux][0].names[0]
+            asl.osl.forms_by_xsux[xsux][0].names[0]
           }</td><td>{
             get_pretty_list_number(xsux, "SYA") or ""
           }</td><td>{
@@ -23,13 +23,13 @@ for forms in osl.forms_by_name.values():
           "𒅓", "𒐌")
       if new != old:
         print(f"*** Changing encoding of {form.names[0]} from {old} to {new}")
-        form.unicode_cuneiform.text = new
+        osl.set_unicode_cuneiform(form, new)
 
 for forms in (osl.forms_by_name["BAD"], osl.forms_by_name["IDIM"]):
   for form in forms:
-    for v in form.values:
+    for v in list(form.values):
       if v.text == "eše₃":
-        form.values.remove(v)
+        osl.remove_value(form, v)
 
 encoded_forms_by_value: dict[str, dict[str, list[asl.Form]]] = {}
 encoded_forms_by_list_number: dict[str, dict[str, list[asl.Form]]] = {}
@@ -43,7 +43,7 @@ for name, forms in osl.forms_by_name.items():
     for form in forms:
       if not form.unicode_cuneiform:
         print(f"*** Missing {encoding} on {form.names[0]}")
-        form.unicode_cuneiform = asl.UnicodeCuneiform(encoding)
+        osl.set_unicode_cuneiform(form, encoding)
         form.unicode_age = source_form.unicode_age
         form.unicode_pua = source_form.unicode_pua
 
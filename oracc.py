@@ -0,0 +1,312 @@
+"""Traversal of Oracc corpusjson documents.
+
+walk visits the nodes of a document without recursion, calling any number of
+visitors on each node, so that several analyses, such as the indexing of
+values, the listing of cuneiform signs, and the extraction of lines, are done
+in a single pass over each document.  analyse_corpus does this for the
+requested analyses, reading the corpus once.
+"""
+
+from collections import defaultdict
+import json
+import os
+import time
+from typing import Any, Iterable, Iterator
+
+# The keys under which a node has its children, in the order in which they
+# are visited.  "f" holds a single child, the others a list.  We do not go
+# down into "qualified" for now (the index is on default values).
+CHILD_KEYS = ("cdl", "f", "gdl", "group", "seq")
+
+class Visitor:
+  def enter(self, node: Any, key: str|None) -> bool:
+    """Called on node before its children; key is the key under which node is
+    found in its parent, or None for the document.  If this returns false, the
+    visitor is not called on the descendants of node, nor on leave(node).
+    """
+    return True
+
+  def leave(self, node: Any):
+    """Called on node after its children."""
+    pass
+
+def walk(document: Any, visitors: list[Visitor]):
+  """Visits the nodes of the document in order with the given visitors."""
+  # The nodes to enter, with the key under which they are found and the
+  # visitors still interested in them, or to leave if the last element is
+  # true.
+  stack: list[tuple[Any, str|None, list[Visitor], bool]] = [(document, None, visitors, False)]
+  while stack:
+    node, key, active_visitors, leaving = stack.pop()
+    if leaving:
+      for visitor in active_visitors:
+        visitor.leave(node)
+      continue
+    active_visitors = [visitor for visitor in active_visitors if visitor.enter(node, key)]
+    if not active_visitors:
+      continue
+    stack.append((node, key, active_visitors, True))
+    for child_key in reversed(CHILD_KEYS):
+      if child_key not in node:
+        continue
+      if child_key == "f":
+        stack.append((node["f"], "f", active_visitors, False))
+      else:
+        stack.extend((child, child_key, active_visitors, False)
+                     for child in reversed(node[child_key]))
+
+class ValueIndexer(Visitor):
+  """Indexes the values in a text, and its CV-VC and CV-V-VC sequences, in
+  occurrences by language, value, and period.  Determinatives are skipped.
+  """
+
+  def __init__(self,
+               occurrences: dict[str, dict[str, dict[str, list[str]]]],
+               artefact: str,
+               period: str):
+    # Imported here, since atf prints its grapheme pattern when imported, and
+    # the scripts that do not index values do not need it.
+    import atf
+    self.atf = atf
+    self.occurrences = occurrences
+    self.artefact = artefact
+    self.period = period
+    # For each node being visited: its language; the values before it that
+    # are followed by -, if it is in a gdl, None otherwise; and those values
+    # for its own gdl.
+    self.frames: list[tuple[str, list[str]|None, list[str]|None]] = []
+
+  def enter(self, node: Any, key: str|None) -> bool:
+    if self.frames:
+      language, _, gdl_values = self.frames[-1]
+    else:
+      language, gdl_values = "und", None
+    consecutive_values = gdl_values if key == "gdl" else None
+    if "det" in node:
+      if consecutive_values:
+        consecutive_values.clear()
+      return False
+    if "lang" in node:
+      language = node["lang"].split("-")[0]
+    self.frames.append((language, consecutive_values, [] if "gdl" in node else None))
+    return True
+
+  def leave(self, node: Any):
+    atf = self.atf
+    language, consecutive_values, _ = self.frames.pop()
+    if "v" not in node:
+      if consecutive_values:
+        consecutive_values.clear()
+      return
+    value = atf.normalize_grapheme(node["v"])
+    value_to_period_to_occurrences = self.occurrences[language]
+    if consecutive_values is not None:
+      if consecutive_values and atf.is_vc(value):
+        preceding = consecutive_values[-1]
+        this_vowel = atf.get_vowel(value)
+        if atf.get_vowel(preceding, None) == this_vowel:
+          if atf.is_cv(preceding):
+            value_to_period_to_occurrences[
+              preceding + "-" + value][self.period].append(self.artefact)
+          elif atf.is_v(preceding) and len(consecutive_values) >= 2:
+            if atf.is_cv(consecutive_values[-2]) and atf.get_vowel(consecutive_values[-2]) == this_vowel:
+              value_to_period_to_occurrences[
+                consecutive_values[-2] + "-" +
+                preceding + "-" +
+                value][self.period].append(self.artefact)
+
+      if node.get("delim") == "-":
+        consecutive_values.append(value)
+      else:
+        consecutive_values.clear()
+    value_to_period_to_occurrences[value][self.period].append(self.artefact)
+
+class SignLister(Visitor):
+  """Lists the occurrences of the code points of the Cuneiform and Cuneiform
+  Numbers and Punctuation blocks in a text.
+  """
+
+  def __init__(self):
+    self.signs: list[str] = []
+
+  def leave(self, node: Any):
+    if "utf8" in node:
+      self.signs += (c for c in node["utf8"] if 0x12000 <= ord(c) <= 0x1268F)
+
+class Line:
+  def __init__(self, source: str, ref: str, label: str, xsux: str) -> None:
+    self.source = source
+    self.ref = ref
+    self.label = label
+    self.xsux = xsux
+
+  def __repr__(self) -> str:
+     return f"Line({repr(self.ref)}, {repr(self.label)}, {repr(self.xsux)})"
+
+  def __str__(self) -> str:
+     return f"{self.source}/{self.ref}\t{self.label}\t{self.xsux}"
+
+  def html_ref(self) -> str:
+     return f"<a href='{self.source}/{self.ref}'>{self.source}/{self.ref.split('.')[0]} {self.label}</a>"
+
+  def html(self) -> str:
+     return f"<tr><td>{self.html_ref()}</td><td class=xsux>{self.xsux}</td></tr>"
+
+class LineExtractor(Visitor):
+  """Extracts the lines of a text, with their cuneiform."""
+
+  def __init__(self):
+    self.lines: list[Line] = []
+    self.source = ""
+
+  def enter(self, node: Any, key: str|None) -> bool:
+    if key is None:
+      if "source" not in node:
+        raise ValueError("Missing source", node)
+      self.source = node["source"]
+    if node.get("type") == "line-start":
+      if "label" in node:
+        self.lines.append(Line(self.source, node["ref"], node["label"], ""))
+      else:
+        print(f"*** Line with no label: {node['ref']}")
+    return True
+
+  def leave(self, node: Any):
+    # Cuneiform before the first line is not in any line; skipping it rather
+    # than failing lets the other analyses of analyse_corpus see the text.
+    if "utf8" in node and self.lines:
+      self.lines[-1].xsux += node["utf8"]
+
+def short_period(metadata: dict[str, Any]) -> str:
+  """The period of a text in its catalogue metadata, abbreviated as in the
+  CDLI ATF files, e.g., NA for Neo-Assyrian.
+  """
+  return metadata.get("period", "unknown").replace("Neo ", "Neo-").replace(
+    "Old ", "O").replace("Middle ", "M").replace("Neo-", "N").replace(
+    "Assyrian", "A").replace("Babylonian", "B")
+
+class CorpusAnalysis:
+  """The results of the analyses of a corpus by analyse_corpus."""
+
+  def __init__(self,
+               value_occurrences: dict[str, dict[str, dict[str, list[str]]]]|None = None):
+    # The artefacts by period, value, and language, as indexed by ValueIndexer.
+    self.value_occurrences = value_occurrences if value_occurrences is not None else defaultdict(
+        lambda: defaultdict(
+          lambda: defaultdict(list)))
+    # The CDLI number of each text, with the signs listed by SignLister.
+    self.text_signs: list[tuple[str, list[str]]] = []
+    # The lines of the texts, as extracted by LineExtractor.
+    self.lines: list[Line] = []
+    self.time_reading_files = 0.0
+    self.time_loading_json = 0.0
+
+def analyse_corpus(directories: Iterable[str],
+                   analysis: CorpusAnalysis|None = None,
+                   values: bool = False,
+                   signs: bool = False,
+                   lines: bool = False,
+                   catalogued_only: bool = True) -> CorpusAnalysis:
+  """Reads the texts in the given directories once, and walks each of them
+  once with the visitors for the requested analyses: a ValueIndexer if values,
+  a SignLister if signs, and a LineExtractor if lines.  The results are added
+  to analysis, or to a new CorpusAnalysis, which is returned.
+  If catalogued_only, only the texts in the catalogues are read, see
+  corpus_texts; otherwise all the files in corpusjson directories are, see
+  corpusjson_texts.
+  """
+  if not (values or signs or lines):
+    raise ValueError("No analysis requested")
+  result = analysis or CorpusAnalysis()
+  texts = corpus_texts if catalogued_only else corpusjson_texts
+  for directory in directories:
+    for cdli_number, text_file, metadata, text in texts(directory, result):
+      visitors: list[Visitor] = []
+      if values:
+        visitors.append(
+            ValueIndexer(result.value_occurrences, cdli_number, short_period(metadata)))
+      if signs:
+        sign_lister = SignLister()
+        visitors.append(sign_lister)
+      if lines:
+        line_extractor = LineExtractor()
+        visitors.append(line_extractor)
+      try:
+        walk(text, visitors)
+      except Exception:
+        print(f"*** Exception while reading {text_file}:")
+        raise
+      if signs:
+        result.text_signs.append((cdli_number, sign_lister.signs))
+      if lines:
+        result.lines += line_extractor.lines
+  return result
+
+def corpusjson_texts(directory: str,
+                     analysis: CorpusAnalysis) -> Iterator[tuple[str, str, dict[str, Any], Any]]:
+  """Like corpus_texts, but yields all the files in the corpusjson
+  directories, whether catalogued or not, with empty metadata.
+  """
+  for filename in os.listdir(directory):
+    if not os.path.isdir(directory + "/" + filename):
+      continue
+    if filename != "corpusjson":
+      yield from corpusjson_texts(directory + "/" + filename, analysis)
+      continue
+    files = os.listdir(directory + "/corpusjson")
+    print(f"{len(files)} texts in {directory}...")
+    for filename in files:
+      text_file = directory + "/corpusjson/" + filename
+      with open(text_file, encoding="utf-8") as f:
+        start = time.time()
+        source = f.read()
+        analysis.time_reading_files += time.time() - start
+        if not source:
+          print(f"*** {filename} in {directory} is empty, skipping.")
+          continue
+        start = time.time()
+        text = json.loads(source)
+        analysis.time_loading_json += time.time() - start
+      yield filename.removesuffix(".json"), text_file, {}, text
+
+def corpus_texts(directory: str,
+                 analysis: CorpusAnalysis) -> Iterator[tuple[str, str, dict[str, Any], Any]]:
+  """Yields the CDLI number, the file, the catalogue metadata, and the
+  corpusjson document of the texts catalogued in directory and its
+  subdirectories.  The time taken is added to that of analysis.
+  """
+  listing = os.listdir(directory)
+  if "catalogue.json" in listing:
+    with open(directory + "/catalogue.json", encoding="utf-8") as f:
+      catalogue = json.loads(f.read())
+    files = [
+        (cdli_number,
+         directory + "/corpusjson/" + cdli_number + ".json",
+         metadata)
+        for cdli_number, metadata in catalogue["members"].items()
+        if os.path.isfile(directory + "/corpusjson/" + cdli_number + ".json")]
+    print(f"Indexing {len(files)} texts in {directory}...")
+    skipped : list[str] = []
+    for i, (cdli_number, text_file, metadata) in enumerate(files):
+      if i > 0 and i % 1000 == 0:
+        print(f"    {i}/{len(files)}...")
+      with open(text_file, encoding="utf-8") as f:
+        start = time.time()
+        source = f.read()
+        analysis.time_reading_files += time.time() - start
+        if not source:
+          skipped.append(text_file)
+          continue
+        start = time.time()
+        text = json.loads(source)
+        analysis.time_loading_json += time.time() - start
+      yield cdli_number, text_file, metadata, text
+    if skipped:
+      if len(skipped) < 10:
+        for file in skipped:
+          print(f"*** {file} was empty, skipped.")
+      else:
+        print(f"*** Skipped {len(skipped)} empty files.")
+  for f in listing:
+    if os.path.isdir(directory + "/" + f) and f != "corpusjson":
+      yield from corpus_texts(directory + "/" + f, analysis)
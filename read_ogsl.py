@@ -2,10 +2,13 @@
 import sys
 import re
 import codecs
+import functools
 import unicodedata
 
 import numbers
 
+import sign_names
+
 #sys.stdout = codecs.getwriter("utf-16")(sys.stdout.detach())
 
 
@@ -26,81 +29,82 @@ MODIFIERS = {
 }
 
 
-def compute_expected_unicode_name_at(string, index, inner_plus):
+UNICODE_OPERATORS = {
+  "": "",
+  ".": ".",
+  "+": ".",
+  "%": " CROSSING ",
+  "&": " OVER ",
+  "@": " OPPOSING ",
+  "×": " TIMES ",
+}
+
+
+def grapheme_unicode_name(grapheme):
   expected_unicode_name = ""
-  i = index
-  while i < len(string):
-    c = string[i]
-    if (i + 4 <= len(string) and
-        string[i:i+3] == "LAK" and
-        string[i+3].isdigit()):
+  i = 0
+  while i < len(grapheme):
+    c = grapheme[i]
+    if (i + 4 <= len(grapheme) and
+        grapheme[i:i+3] == "LAK" and
+        grapheme[i+3].isdigit()):
       lak_number = 0
       i += 3
-      while i < len(string) and string[i].isdigit():
+      while i < len(grapheme) and grapheme[i].isdigit():
         lak_number *= 10
-        lak_number += int(string[i])
+        lak_number += int(grapheme[i])
         i += 1
       expected_unicode_name += "LAK-%03d" % lak_number
       continue
     i += 1
     if c == "|":
       continue
-    elif c == "(":
-      opened = i-1
-      (inner_sign, i) = compute_expected_unicode_name_at(string, i, inner_plus)
-      if (string[i-1] != ")"):
-        raise ValueError(f"unmatched parenthesis in {string},\n{string}\n{(opened)*' '+'('+(i-2-opened)*'~'+string[i-1]}")
-      inner_sign = inner_sign.replace(".".join(3*["DISH"]), "THREE DISH")
-      inner_sign = inner_sign.replace(".".join(3*["DISH TENU"]), "THREE DISH TENU")
-      # Unicode uses PLUS for . in inner signs ×., thus
-      # 𒌍 U.U.U is U U U but 𒀔 AB×(U.U.U) is AB TIMES U PLUS U PLUS U,
-      # 𒀙 AB₂×(ME.EN) is AB₂ TIMES ME PLUS EN.
-      # TODO(egg): It’s messier than that.  Clarify.
-      expected_unicode_name += (inner_sign.replace(".", " PLUS ")
-                                if inner_plus else
-                                inner_sign.replace(".", " "))
-    elif c == ")":
-      break
     elif c == "Š":
       expected_unicode_name += "SH"
     elif c in "₀₁₂₃₄₅₆₇₈₉":
       expected_unicode_name += chr(ord("0") + ord(c) - ord("₀"))
-    elif c == "%":
-      expected_unicode_name += " CROSSING "
-    elif c == "&":
-      expected_unicode_name += " OVER "
-    elif c in "+":
-      expected_unicode_name += "."
-    elif c == "×":
-      expected_unicode_name += " TIMES "
-    elif c == "@":
-      ahead = name[i]
-      if ahead.islower() or ahead.isdigit():
-        if ahead.isdigit():
-          ahead = ""
-          while i < len(string) and name[i].isdigit():
-            ahead += name[i]
-            i += 1
-        else:
-          i += 1
-        if ahead in MODIFIERS:
-          expected_unicode_name += " " + MODIFIERS[ahead]
-        else:
-          raise ValueError(f"Unexpected modifier @{ahead} in {name}")
-      else:
-        expected_unicode_name += " OPPOSING "
     else:
       expected_unicode_name += c
+  return expected_unicode_name
+
+
+def unicode_name_parts(name, inner_plus):
+  if isinstance(name, sign_names.Grapheme):
+    return grapheme_unicode_name(name.text)
+  elif isinstance(name, sign_names.Group):
+    inner_sign = compute_expected_unicode_name_of(name.inner, inner_plus)
+    inner_sign = inner_sign.replace(".".join(3*["DISH"]), "THREE DISH")
+    inner_sign = inner_sign.replace(".".join(3*["DISH TENU"]), "THREE DISH TENU")
+    # Unicode uses PLUS for . in inner signs ×., thus
+    # 𒌍 U.U.U is U U U but 𒀔 AB×(U.U.U) is AB TIMES U PLUS U PLUS U,
+    # 𒀙 AB₂×(ME.EN) is AB₂ TIMES ME PLUS EN.
+    # TODO(egg): It’s messier than that.  Clarify.
+    return (inner_sign.replace(".", " PLUS ")
+            if inner_plus else
+            inner_sign.replace(".", " "))
+  elif isinstance(name, sign_names.Modified):
+    if name.modifier not in MODIFIERS:
+      raise ValueError(f"Unexpected modifier @{name.modifier} in {name.text}")
+    return unicode_name_parts(name.operand, inner_plus) + " " + MODIFIERS[name.modifier]
+  else:
+    return UNICODE_OPERATORS[name.operator].join(
+        unicode_name_parts(operand, inner_plus) for operand in name.operands)
+
+
+# Memoized, since the same components recur in many names.
+@functools.cache
+def compute_expected_unicode_name_of(name, inner_plus):
+  expected_unicode_name = unicode_name_parts(name, inner_plus)
   expected_unicode_name = re.sub("(^|\.)3 TIMES ([^.]*)", r"\1\2 THREE TIMES", expected_unicode_name)
   expected_unicode_name = re.sub("(^|\.)4 TIMES ([^.]*)", r"\1\2 SQUARED", expected_unicode_name)
-  return (expected_unicode_name, i)
+  return expected_unicode_name
 
 
 def compute_expected_unicode_name(string, inner_plus=True):
   # Unicode sometimes distributes & over ., but not always.
   if string == "|(KASKAL.LAGAB×U)&(KASKAL.LAGAB×U)|":
     string = "|(KASKAL&KASKAL).(LAGAB×U&LAGAB×U)|"
-  name = compute_expected_unicode_name_at(string, 0, inner_plus)[0]
+  name = compute_expected_unicode_name_of(sign_names.parse_sign_name(string), inner_plus)
   return name.replace(".", " ") if inner_plus else name.replace(".", " PLUS ")
 
 
@@ -517,7 +521,13 @@ for name, forms in forms_by_name.items():
   if name.startswith("|") and name.endswith("|") and not forms[0].codepoints:
     encoding = ""
     components = []
-    for component in re.findall(r"(?:[^.()]|\([^()]+\))+", name[1:-1]):
+    try:
+      component_names = sign_names.parse_sign_name(name).components()
+    except ValueError as error:
+      print(f"*** {error}")
+      continue
+    for component_name in component_names:
+      component = component_name.text
       if "×" in component or "%" in component or "&" in component:
         component = f"|{component}|"
       if component in forms_by_name and forms_by_name[component][0].codepoints:
@@ -560,7 +570,11 @@ for name, forms in forms_by_name.items():
   if name== "OO" or name=="O":
     continue
 
-  expected_unicode_name = compute_expected_unicode_name(name)
+  try:
+    expected_unicode_name = compute_expected_unicode_name(name)
+  except ValueError as error:
+    print(f"*** {error}")
+    continue
 
   if expected_unicode_name == "PESH2~v":
     expected_unicode_name = "PESH2 ASTERISK"
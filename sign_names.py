@@ -0,0 +1,242 @@
+"""Parsing of sign names such as |A.AN.(U×KUR)| or KA₂@g into syntax trees.
+
+The nodes are interned: parsing equal names, or names with equal components,
+yields the same nodes, so that what is computed about a component, such as its
+encoding, can be memoized on the node and shared by all names that contain it.
+"""
+
+import re
+import sys
+from typing import Callable, Iterator, Optional
+
+# The binary operators, from the loosest to the tightest.  @ followed by
+# neither a lowercase letter nor a digit is “opposing”; otherwise it introduces
+# a modifier such as @g or @180.
+OPERATORS = (".", "+", "&", "%", "@", "×")
+PRECEDENCE = {operator: i for i, operator in enumerate(OPERATORS)}
+
+TOKEN = re.compile(r"[.+&%×()]|@(?:[a-z]|[0-9]+)?")
+# Names such as A.AN, which are most of the compound names, are parsed without
+# tokenization.
+GRAPHEME_SEQUENCE = re.compile(r"[^.+&%×()@]+(?:\.[^.+&%×()@]+)*")
+
+class SignName:
+  """A node of the syntax tree of a sign name.  text is the source of the node,
+  without the |…| around a compound name.
+  """
+  __slots__ = ("text",)
+  text: str
+
+  def components(self) -> tuple["SignName", ...]:
+    """The operands of the outermost ., or the name itself if there is none."""
+    return (self,)
+
+  def iter_tokens(self) -> Iterator["Grapheme|str"]:
+    """The graphemes of the name, interspersed with its operators, modifiers,
+    and parentheses, in order.
+    """
+    raise NotImplementedError()
+
+  def __repr__(self):
+    return f"{type(self).__name__}({self.text!r})"
+
+class Grapheme(SignName):
+  __slots__ = ()
+
+  def __init__(self, text: str):
+    self.text = sys.intern(text)
+
+  def iter_tokens(self) -> Iterator["Grapheme|str"]:
+    yield self
+
+class Group(SignName):
+  """A parenthesized name."""
+  __slots__ = ("inner",)
+  inner: SignName
+
+  def __init__(self, text: str, inner: SignName):
+    self.text = text
+    self.inner = inner
+
+  def iter_tokens(self) -> Iterator[Grapheme|str]:
+    yield "("
+    yield from self.inner.iter_tokens()
+    yield ")"
+
+class Operation(SignName):
+  """Operands joined by one of the OPERATORS, or juxtaposed, as in 3(AŠ), if
+  the operator is empty.
+  """
+  __slots__ = ("operator", "operands")
+  operator: str
+  operands: tuple[SignName, ...]
+
+  def __init__(self, text: str, operator: str, operands: tuple[SignName, ...]):
+    self.text = text
+    self.operator = operator
+    self.operands = operands
+
+  def components(self) -> tuple[SignName, ...]:
+    return self.operands if self.operator == "." else (self,)
+
+  def iter_tokens(self) -> Iterator[Grapheme|str]:
+    for i, operand in enumerate(self.operands):
+      if i and self.operator:
+        yield self.operator
+      yield from operand.iter_tokens()
+
+class Modified(SignName):
+  """A name followed by a modifier such as g in KA₂@g."""
+  __slots__ = ("operand", "modifier")
+  operand: SignName
+  modifier: str
+
+  def __init__(self, text: str, operand: SignName, modifier: str):
+    self.text = text
+    self.operand = operand
+    self.modifier = modifier
+
+  def iter_tokens(self) -> Iterator[Grapheme|str]:
+    yield from self.operand.iter_tokens()
+    yield "@" + self.modifier
+
+# The nodes by text.
+interned_names: dict[str, SignName] = {}
+
+class NameParser:
+  """A recursive descent parser for a single name."""
+
+  def __init__(self, name: str):
+    self.name = name
+    # The tokens, and their offsets in name; graphemes are the text between
+    # the matches of TOKEN.
+    self.tokens: list[str] = []
+    self.starts: list[int] = []
+    start = 0
+    for match in TOKEN.finditer(name):
+      if match.start() > start:
+        self.tokens.append(name[start:match.start()])
+        self.starts.append(start)
+      self.tokens.append(match[0])
+      self.starts.append(match.start())
+      start = match.end()
+    if start < len(name):
+      self.tokens.append(name[start:])
+      self.starts.append(start)
+    self.tokens.append("")
+    self.starts.append(len(name))
+    self.position = 0
+
+  def peek(self) -> str:
+    """The next token, or the empty string at the end."""
+    return self.tokens[self.position]
+
+  def is_grapheme(self, token: str) -> bool:
+    return token != "" and token[0] not in ".+&%×()@"
+
+  def error(self, message: str) -> ValueError:
+    return ValueError(f"{message} in sign name {self.name}")
+
+  def intern(self, node: SignName) -> SignName:
+    return interned_names.setdefault(node.text, node)
+
+  def text_from(self, first_token: int) -> str:
+    return self.name[self.starts[first_token]:self.starts[self.position]]
+
+  def parse(self) -> SignName:
+    result = self.parse_operation(0)
+    if self.peek():
+      raise self.error(f"Unexpected {self.peek()}")
+    return result
+
+  def parse_operation(self, min_precedence: int) -> SignName:
+    first_token = self.position
+    result = self.parse_juxtaposition()
+    tokens = self.tokens
+    while (precedence := PRECEDENCE.get(tokens[self.position], -1)) >= min_precedence:
+      operator = tokens[self.position]
+      operands = [result]
+      while tokens[self.position] == operator:
+        self.position += 1
+        operands.append(self.parse_operation(precedence + 1))
+      result = self.intern(Operation(
+          self.text_from(first_token), operator, tuple(operands)))
+    return result
+
+  def parse_juxtaposition(self) -> SignName:
+    first_token = self.position
+    operands = [self.parse_modified()]
+    while self.peek() == "(" or self.is_grapheme(self.peek()):
+      operands.append(self.parse_modified())
+    if len(operands) == 1:
+      return operands[0]
+    return self.intern(Operation(self.text_from(first_token), "", tuple(operands)))
+
+  def parse_modified(self) -> SignName:
+    first_token = self.position
+    result = self.parse_primary()
+    while (token := self.peek()).startswith("@") and len(token) > 1:
+      self.position += 1
+      result = self.intern(Modified(self.text_from(first_token), result, token[1:]))
+    return result
+
+  def parse_primary(self) -> SignName:
+    token = self.peek()
+    if not token:
+      raise self.error("Unexpected end")
+    first_token = self.position
+    self.position += 1
+    if token == "(":
+      inner = self.parse_operation(0)
+      if self.peek() != ")":
+        raise self.error("Unmatched parenthesis")
+      self.position += 1
+      return self.intern(Group(self.text_from(first_token), inner))
+    if not self.is_grapheme(token):
+      raise self.error(f"Unexpected {token}")
+    return interned_names.get(token) or self.intern(Grapheme(token))
+
+def parse_sign_name(name: str) -> SignName:
+  """Parses a sign name, with or without the |…| around a compound name.
+  Raises ValueError if the name is malformed.
+  """
+  if len(name) > 1 and name[0] == "|" and name[-1] == "|":
+    name = name[1:-1]
+  if result := interned_names.get(name):
+    return result
+  if GRAPHEME_SEQUENCE.fullmatch(name):
+    graphemes = tuple(interned_names.get(grapheme) or
+                      interned_names.setdefault(grapheme, Grapheme(grapheme))
+                      for grapheme in name.split("."))
+    if len(graphemes) == 1:
+      return graphemes[0]
+    return interned_names.setdefault(name, Operation(name, ".", graphemes))
+  return NameParser(name).parse()
+
+class Resolver:
+  """Resolves sign names to their encodings, given the encoding of a single
+  name as returned by lookup, or None if it has none.  Each distinct node is
+  looked up at most once.
+  """
+
+  def __init__(self, lookup: Callable[[str], Optional[str]]):
+    self.lookup = lookup
+    self.encodings: dict[SignName, Optional[str]] = {}
+
+  def encoding(self, name: SignName) -> Optional[str]:
+    if name in self.encodings:
+      return self.encodings[name]
+    encoding = self.encodings[name] = self.lookup(name.text)
+    return encoding
+
+  def sequence(self, name: SignName) -> list[str]:
+    """The encodings of the components of name, or [] if any of them has
+    none.
+    """
+    result = []
+    for component in name.components():
+      encoding = self.encoding(component)
+      if encoding is None:
+        return []
+      result.append(encoding)
+    return result
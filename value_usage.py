@@ -1,15 +1,10 @@
 from collections import defaultdict
-import json
-import os
 import time
 import urllib.parse
-from typing import Any
 
 import atf
 import asl
-
-time_reading_oracc_file = 0
-time_loading_json = 0
+import oracc
 
 language_to_value_to_period_to_occurrences : dict[
   str, dict[
@@ -18,141 +13,8 @@ language_to_value_to_period_to_occurrences : dict[
         lambda: defaultdict(
           lambda: defaultdict(list)))
 
-def index_values(text_json: Any,
-                 artefact: str,
-                 period: str,
-                 genre: str,
-                 lang: str = "und",
-                 consecutive_values:list[str]|None=None):
-  if "det" in text_json:
-    if consecutive_values:
-      consecutive_values.clear()
-    return
-  if "lang" in text_json:
-    lang = text_json["lang"].split("-")[0]
-  if "cdl" in text_json:
-    for node in text_json["cdl"]:
-      index_values(node, artefact, period, genre, lang)
-  if "f" in text_json:
-      index_values(text_json["f"], artefact, period, genre, lang)
-  if "gdl" in text_json:
-     gdl_values : list[str] = []
-     for node in text_json["gdl"]:
-      index_values(node, artefact, period, genre, lang, gdl_values)
-  if "group" in text_json:
-     for node in text_json["group"]:
-      index_values(node, artefact, period, genre, lang)
-  if "seq" in text_json:
-     for node in text_json["seq"]:
-      index_values(node, artefact, period, genre, lang)
-  # We do not go down into "qualified" for now (the index is on default values).
-  if "v" in text_json:
-    if consecutive_values is not None:
-      if consecutive_values and atf.is_vc(text_json["v"]):
-        preceding = consecutive_values[-1]
-        this_vowel = atf.get_vowel(text_json["v"])
-        if atf.get_vowel(preceding, None) == this_vowel:
-          if atf.is_cv(preceding):
-            language_to_value_to_period_to_occurrences[
-              lang][preceding + "-" + text_json["v"]][period].append(artefact)
-          elif atf.is_v(preceding) and len(consecutive_values) >= 2:
-            if atf.is_cv(consecutive_values[-2]) and atf.get_vowel(consecutive_values[-2]) == this_vowel:
-              language_to_value_to_period_to_occurrences[
-                lang][consecutive_values[-2] + "-" +
-                      preceding + "-" +
-                      text_json["v"]][period].append(artefact)
-
-      if text_json.get("delim") == "-":
-        consecutive_values.append(text_json["v"])
-      else:
-        consecutive_values.clear()
-    language_to_value_to_period_to_occurrences[
-      lang][text_json["v"]][period].append(artefact)
-  elif consecutive_values:
-    consecutive_values.clear()
-
-def index(directory: str):
-  global time_reading_oracc_file
-  global time_loading_json
-  listing = os.listdir(directory)
-  if "catalogue.json" in listing:
-    with open(directory + "/catalogue.json", encoding="utf-8") as f:
-      catalogue = json.loads(f.read())
-    files = [
-        (cdli_number,
-         directory + "/corpusjson/" + cdli_number + ".json",
-         metadata)
-        for cdli_number, metadata in catalogue["members"].items()
-        if os.path.isfile(directory + "/corpusjson/" + cdli_number + ".json")]
-    print(f"Indexing {len(files)} texts in {directory}...")
-    skipped : list[str] = []
-    for i, (cdli_number, text_file, metadata) in enumerate(files):
-      if i > 0 and i % 1000 == 0:
-        print(f"    {i}/{len(files)}...")
-      with open(text_file, encoding="utf-8") as f:
-        start = time.time()
-        source = f.read()
-        time_reading_oracc_file += time.time() - start
-        if not source:
-          skipped.append(text_file)
-          continue
-        start = time.time()
-        text = json.loads(source)
-        time_loading_json += time.time() - start
-      index_values(
-        text,
-        cdli_number,
-        metadata.get("period", "unknown").replace("Neo ", "Neo-").replace(
-          "Old ", "O").replace("Middle ", "M").replace("Neo-", "N").replace(
-          "Assyrian", "A").replace("Babylonian", "B"),
-        metadata.get("genre", metadata.get("subgenre", "unclassified")).lower())
-    if skipped:
-      if len(skipped) < 10:
-        for file in skipped:
-          print(f"*** {file} was empty, skipped.")
-      else:
-        print(f"*** Skipped {len(skipped)} empty files.")
-  for f in listing:
-    if os.path.isdir(directory + "/" + f) and f != "corpusjson":
-      index(directory + "/" + f)
-
 ORACC_PROJECTS = ("akklove", "atae", "babcity", "balt", "blms", "dcclt", "riao", "ribo", "rinap", "saao", "tcma")
 
-start = time.time()
-for project in ORACC_PROJECTS:
-  index(f"oracc/{project}")
-time_indexing_oracc_values = time.time() - start
-
-cdli_occurrences : list[str] = []
-
-oracc_occurrences = [o
-                     for l in language_to_value_to_period_to_occurrences
-                     for v in language_to_value_to_period_to_occurrences[l]
-                     for p in language_to_value_to_period_to_occurrences[l][v]
-                     for o in language_to_value_to_period_to_occurrences[l][v][p]]
-
-start = time.time()
-for file in ("OAkk", "Early OB", "OA", "OB akk", "MA", "MB", "Early NB", "NA", "NB"):
-  covered_by_oracc : set[str] = set()
-  for v, occurrences in atf.get_value_counts(
-      f"cdli/{file}.atf",
-      "akk",
-      set((atf.SpanAttribute.DETERMINATIVE, atf.SpanAttribute.LOGOGRAM))).items():
-    cdli_occurrences += occurrences
-    oracc_texts = set(language_to_value_to_period_to_occurrences["akk"][v][file.removesuffix(" akk")])
-    for occurrence in occurrences:
-      if occurrence in oracc_texts:
-        covered_by_oracc.add(occurrence)
-      else:
-        language_to_value_to_period_to_occurrences["akk"][v][file.removesuffix(" akk")].append(occurrence)
-  print(f"--- {len(covered_by_oracc)} artefacts already covered by Oracc in {file}")
-time_indexing_cdli_values = time.time() - start
-
-print(f"--- Indexed {len(oracc_occurrences)} occurrences from {len(set(oracc_occurrences))} Oracc texts in {time_indexing_oracc_values} s")
-print(f"--- Whereof {time_reading_oracc_file} s reading files")
-print(f"--- Whereof {time_loading_json} s parsing JSON")
-print(f"--- Indexed {len(cdli_occurrences)} occurrences from {len(set(cdli_occurrences))} CDLI texts in {time_indexing_cdli_values} s")
-
 syllabary_index : list[asl.Sign] = []
 base_to_values : dict[str, list[str]] = defaultdict(list)
 
@@ -283,50 +145,6 @@ base_to_signs_and_values : dict[str, list[tuple[tuple[asl.Sign, ...], tuple[asl.
 text_to_value : dict[str, asl.Value] = {}
 values_to_signs : dict[asl.Value, asl.Sign] = {}
 
-for sign in asl.osl.signs:
-  if not isinstance(sign, asl.Sign) or sign.deprecated:
-    continue
-  for value in sign.values:
-    if value.deprecated:
-      continue
-    if value.text == "xₓ":
-      # A garbage value which somehow sneaks in unqualified in a few places in
-      # Oracc.
-      continue
-    if "-" in value.text:
-      # - in OSL values is an oddity which we ignore (otherwise it is
-      # ambiguous whether a sequence of values is one or two signs).
-      continue
-    text_to_value[value.text] = value
-    values_to_signs[value] = sign
-    usage = value_to_period_to_occurrences[value.text]
-    for period, occurrences in usage.items():
-      if "ₓ" in value.text:
-        raise ValueError(value.text, occurrences)
-      sign_to_period_to_occurrences[sign][period] += occurrences
-    base = atf.get_base(value.text)
-    base_to_signs_and_values[base].append(((sign,), (value,)))
-
-for value, period_to_occurrences in value_to_period_to_occurrences.items():
-  if "-" in value:
-    base = atf.get_base(value)
-    subvalues = value.split("-")
-    # We should check that these error paths are CDLI-only (Oracc values should be in OSL).
-    unknown_values = False
-    for v in subvalues:
-      if v not in text_to_value:
-        print(f"*** Unknown value {v} in {value}")
-        unknown_values = True
-    if unknown_values:
-      continue
-    base_to_signs_and_values[base].append(
-      (tuple(values_to_signs[text_to_value[v]] for v in subvalues),
-       tuple(text_to_value[v] for v in subvalues)))
-  else:
-    base = atf.get_base(value)
-  for period, occurrences in period_to_occurrences.items():
-    base_to_period_to_occurrences[base][period] += occurrences
-
 def entry(period: str, values: tuple[asl.Value, ...], sign: asl.Sign|None):
   sign_occurrences = sign_to_period_to_occurrences[sign][period] if sign else None
   homophone_occurrences = base_to_period_to_occurrences[atf.get_base("-".join(v.text for v in values))][period]
@@ -377,55 +195,138 @@ def table_row(values: tuple[asl.Value, ...], signs: tuple[asl.Sign, ...], sign_s
       </tr>
       """
 
-for sign in asl.osl.signs:
-  if isinstance(sign, asl.Sign):
-    if sign not in sign_to_period_to_occurrences:
-      continue
-    with open("syllabary/akk/" + sign.names[0].replace("|", "").replace("/", "-") + ".html", mode="w", encoding="utf-8") as f:
-      print(HEAD,
-            file=f)
-      print(f"<h1>Akkadian syllabic values of {sign.unicode_cuneiform.text if sign.unicode_cuneiform else sign.names[0]}</h1>", file=f)
-      print(SOURCE, file=f)
-      print(COUNT_SELECTOR, file=f)
-      print(RATIO_SELECTOR, file=f)
-      print(TABLE_PERIODS, file=f)
+if __name__ == "__main__":
+  start = time.time()
+  oracc_analysis = oracc.analyse_corpus(
+      (f"oracc/{project}" for project in ORACC_PROJECTS),
+      oracc.CorpusAnalysis(language_to_value_to_period_to_occurrences),
+      values=True)
+  time_indexing_oracc_values = time.time() - start
 
-      for value in sign.values:
-        if value.deprecated:
-          continue
-        if value.text == "xₓ":
-          continue
-        if not value_to_period_to_occurrences[value.text]:
-          continue
-        print(table_row((value,), (sign,), sign_specific_table=True), file=f)
+  cdli_occurrences : list[str] = []
 
-      print("</table></body></html>", file=f)
+  oracc_occurrences = [o
+                       for l in language_to_value_to_period_to_occurrences
+                       for v in language_to_value_to_period_to_occurrences[l]
+                       for p in language_to_value_to_period_to_occurrences[l][v]
+                       for o in language_to_value_to_period_to_occurrences[l][v][p]]
 
-for base, signs_and_values in base_to_signs_and_values.items():
-  if not any(value_to_period_to_occurrences["-".join(v.text for v in values)] for _, values in signs_and_values):
-    continue
-  with open("syllabary/akk/homophones/" + ("syllable-" if base == "nul" else "") + base + ".html", mode="w", encoding="utf-8") as f:
-    print(HEAD,
-          file=f)
-    print(f"<h1>Akkadian spellings of /{base}/</h1>", file=f)
-    print(SOURCE, file=f)
-    print(COUNT_SELECTOR, file=f)
-    print(RATIO_SELECTOR, file=f)
-    print(TABLE_PERIODS, file=f)
+  start = time.time()
+  for file in ("OAkk", "Early OB", "OA", "OB akk", "MA", "MB", "Early NB", "NA", "NB"):
+    covered_by_oracc : set[str] = set()
+    for v, occurrences in atf.get_value_counts(
+        f"cdli/{file}.atf",
+        "akk",
+        set((atf.SpanAttribute.DETERMINATIVE, atf.SpanAttribute.LOGOGRAM)),
+        parallel=True).items():
+      cdli_occurrences += occurrences
+      oracc_texts = set(language_to_value_to_period_to_occurrences["akk"][v][file.removesuffix(" akk")])
+      for occurrence in occurrences:
+        if occurrence in oracc_texts:
+          covered_by_oracc.add(occurrence)
+        else:
+          language_to_value_to_period_to_occurrences["akk"][v][file.removesuffix(" akk")].append(occurrence)
+    print(f"--- {len(covered_by_oracc)} artefacts already covered by Oracc in {file}")
+  time_indexing_cdli_values = time.time() - start
 
-    for signs, values in sorted(signs_and_values, key=lambda sv: (len(sv[1]), "-".join (v.text for v in sv[1]))):
-      if not value_to_period_to_occurrences["-".join(v.text for v in values)]:
+  print(f"--- Indexed {len(oracc_occurrences)} occurrences from {len(set(oracc_occurrences))} Oracc texts in {time_indexing_oracc_values} s")
+  print(f"--- Whereof {oracc_analysis.time_reading_files} s reading files")
+  print(f"--- Whereof {oracc_analysis.time_loading_json} s parsing JSON")
+  print(f"--- Indexed {len(cdli_occurrences)} occurrences from {len(set(cdli_occurrences))} CDLI texts in {time_indexing_cdli_values} s")
+
+  for sign in asl.osl.signs:
+    if not isinstance(sign, asl.Sign) or sign.deprecated:
+      continue
+    for value in sign.values:
+      if value.deprecated:
         continue
-      print(table_row(values, signs, sign_specific_table=False), file=f)
+      if value.text == "xₓ":
+        # A garbage value which somehow sneaks in unqualified in a few places in
+        # Oracc.
+        continue
+      if "-" in value.text:
+        # - in OSL values is an oddity which we ignore (otherwise it is
+        # ambiguous whether a sequence of values is one or two signs).
+        continue
+      text_to_value[value.text] = value
+      values_to_signs[value] = sign
+      usage = value_to_period_to_occurrences[value.text]
+      for period, occurrences in usage.items():
+        if "ₓ" in value.text:
+          raise ValueError(value.text, occurrences)
+        sign_to_period_to_occurrences[sign][period] += occurrences
+      base = atf.get_base(value.text)
+      base_to_signs_and_values[base].append(((sign,), (value,)))
 
-    print("</table></body></html>", file=f)
+  for value, period_to_occurrences in value_to_period_to_occurrences.items():
+    if "-" in value:
+      base = atf.get_base(value)
+      subvalues = value.split("-")
+      # We should check that these error paths are CDLI-only (Oracc values should be in OSL).
+      unknown_values = False
+      for v in subvalues:
+        if v not in text_to_value:
+          print(f"*** Unknown value {v} in {value}")
+          unknown_values = True
+      if unknown_values:
+        continue
+      base_to_signs_and_values[base].append(
+        (tuple(values_to_signs[text_to_value[v]] for v in subvalues),
+         tuple(text_to_value[v] for v in subvalues)))
+    else:
+      base = atf.get_base(value)
+    for period, occurrences in period_to_occurrences.items():
+      base_to_period_to_occurrences[base][period] += occurrences
 
-with open("syllabary/akk/index.html", mode="w", encoding="utf-8") as f:
-  print("<ul>", file=f)
   for sign in asl.osl.signs:
     if isinstance(sign, asl.Sign):
       if sign not in sign_to_period_to_occurrences:
         continue
-      print(f"<li><a href='{urllib.parse.quote(sign.names[0].replace('|', '').replace('/', '-'))}.html'>{sign.unicode_cuneiform.text if sign.unicode_cuneiform else ''} {sign.names[0]}</a></li>",
+      with open("syllabary/akk/" + sign.names[0].replace("|", "").replace("/", "-") + ".html", mode="w", encoding="utf-8") as f:
+        print(HEAD,
+              file=f)
+        print(f"<h1>Akkadian syllabic values of {sign.unicode_cuneiform.text if sign.unicode_cuneiform else sign.names[0]}</h1>", file=f)
+        print(SOURCE, file=f)
+        print(COUNT_SELECTOR, file=f)
+        print(RATIO_SELECTOR, file=f)
+        print(TABLE_PERIODS, file=f)
+
+        for value in sign.values:
+          if value.deprecated:
+            continue
+          if value.text == "xₓ":
+            continue
+          if not value_to_period_to_occurrences[value.text]:
+            continue
+          print(table_row((value,), (sign,), sign_specific_table=True), file=f)
+
+        print("</table></body></html>", file=f)
+
+  for base, signs_and_values in base_to_signs_and_values.items():
+    if not any(value_to_period_to_occurrences["-".join(v.text for v in values)] for _, values in signs_and_values):
+      continue
+    with open("syllabary/akk/homophones/" + ("syllable-" if base == "nul" else "") + base + ".html", mode="w", encoding="utf-8") as f:
+      print(HEAD,
             file=f)
-  print("</ul>", file=f)
\ No newline at end of file
+      print(f"<h1>Akkadian spellings of /{base}/</h1>", file=f)
+      print(SOURCE, file=f)
+      print(COUNT_SELECTOR, file=f)
+      print(RATIO_SELECTOR, file=f)
+      print(TABLE_PERIODS, file=f)
+
+      for signs, values in sorted(signs_and_values, key=lambda sv: (len(sv[1]), "-".join (v.text for v in sv[1]))):
+        if not value_to_period_to_occurrences["-".join(v.text for v in values)]:
+          continue
+        print(table_row(values, signs, sign_specific_table=False), file=f)
+
+      print("</table></body></html>", file=f)
+
+  with open("syllabary/akk/index.html", mode="w", encoding="utf-8") as f:
+    print("<ul>", file=f)
+    for sign in asl.osl.signs:
+      if isinstance(sign, asl.Sign):
+        if sign not in sign_to_period_to_occurrences:
+          continue
+        print(f"<li><a href='{urllib.parse.quote(sign.names[0].replace('|', '').replace('/', '-'))}.html'>{sign.unicode_cuneiform.text if sign.unicode_cuneiform else ''} {sign.names[0]}</a></li>",
+              file=f)
+    print("</ul>", file=f)